@@ -18,6 +18,9 @@ Structure:
 - Study Buddy: Find study partners
 """
 
+import os
+from importlib import import_module
+
 from flask import Blueprint
 
 # ============================================================================
@@ -28,57 +31,49 @@ student_bp = Blueprint('student', __name__, url_prefix='/student')
 
 
 # ============================================================================
-# IMPORT ALL SUB-BLUEPRINTS
-# ============================================================================
-
-from .auth import auth_bp
-from .posts import posts_bp
-from .profile import profile_bp
-from .connections import connections_bp
-from .messages import messages_bp
-from .threads import threads_bp
-from .badges import badges_bp
-from .reputation import reputation_bp
-from .analytics import analytics_bp
-from .search import search_bp
-from .study_buddy import study_buddy_bp
-
-# Optional routes (uncomment if you have them)
-# from .assignments import assignments_bp
-# from .grades import grades_bp
-# from .attendance import attendance_bp
-# from .fees import fees_bp
-# from .account import account_bp
-# from .notifications import notifications_bp
-# from .resources import resources_bp
-# from .extras import extras_bp
-# from .password_reset import password_reset_bp
-
-
-# ============================================================================
-# REGISTER ALL SUB-BLUEPRINTS
+# SUB-BLUEPRINTS
 # ============================================================================
 
-# Core features
-student_bp.register_blueprint(auth_bp)
-student_bp.register_blueprint(posts_bp)
-student_bp.register_blueprint(profile_bp)
+# Each module exposes "<name>_bp"; modules are only imported when enabled
+STUDENT_BLUEPRINTS = (
+    # Core features
+    "auth",
+    "posts",
+    "profile",
 
-# Social features
-student_bp.register_blueprint(connections_bp)
-student_bp.register_blueprint(messages_bp)
-student_bp.register_blueprint(threads_bp)
-student_bp.register_blueprint(study_buddy_bp)
+    # Social features
+    "connections",
+    "messages",
+    "threads",
+    "study_buddy",
 
-# Gamification
-student_bp.register_blueprint(badges_bp)
-student_bp.register_blueprint(reputation_bp)
+    # Gamification
+    "badges",
+    "reputation",
 
-# Discovery & Analytics
-student_bp.register_blueprint(search_bp)
-student_bp.register_blueprint(analytics_bp)
+    # Discovery & Analytics
+    "search",
+    "analytics",
+)
 
+# Optional routes (add to STUDENT_BLUEPRINTS if you have them)
+# assignments, grades, attendance, fees, account, notifications,
+# resources, extras, password_reset
 
+# Comma-separated feature flags, e.g. STUDENT_DISABLED_BLUEPRINTS=search,study_buddy
+DISABLED_BLUEPRINTS = {
+    name.strip()
+    for name in os.environ.get("STUDENT_DISABLED_BLUEPRINTS", "").split(",")
+    if name.strip()
+}
 
 
+# ============================================================================
+# REGISTER ALL SUB-BLUEPRINTS
+# ============================================================================
 
+for _name in STUDENT_BLUEPRINTS:
+    if _name in DISABLED_BLUEPRINTS:
+        continue
+    _module = import_module(f".{_name}", __package__)
+    student_bp.register_blueprint(getattr(_module, f"{_name}_bp"))
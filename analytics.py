@@ -12,17 +12,27 @@ Features:
 - Post-specific analytics
 """
 
-from flask import Blueprint, request, jsonify, current_app
-from sqlalchemy import func, desc, and_, or_, case
+from flask import Blueprint, request, jsonify, current_app, g, Response, stream_with_context
+from sqlalchemy import (
+    func, desc, and_, or_, case, select, insert, update, delete, literal,
+    union_all, cast, String
+)
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import aliased
 import datetime
 import calendar
+import csv
+import hashlib
+import io
+from concurrent.futures import ThreadPoolExecutor
 
 from models import (
     User, StudentProfile, Post, Comment, Thread, ThreadMember,
     PostLike, PostReaction, PostView, UserActivity, Connection,
-    ReputationHistory, UserBadge, ThreadMessage, Bookmark
+    ReputationHistory, UserBadge, ThreadMessage, Bookmark, UserWeeklyStats,
+    DepartmentRank, UserInsights
 )
-from extensions import db
+from extensions import db, cache
 from routes.student.helpers import (
     token_required, success_response, error_response
 )
@@ -35,11 +45,10 @@ analytics_bp = Blueprint("student_analytics", __name__)
 # ============================================================================
 
 def calculate_engagement_rate(views, likes, comments):
-    """Calculate engagement rate as percentage"""
-    if views == 0:
-        return 0
+    """Calculate engagement rate as percentage (0 for unviewed posts)"""
     total_engagement = likes + (comments * 2)  # Comments worth more
-    return round((total_engagement / views) * 100, 1)
+    # Branchless: max() guards the division, min() zeroes unviewed posts
+    return round(total_engagement * 100 * min(views, 1) / max(views, 1), 1)
 
 
 def get_activity_level(activity_score):
@@ -54,44 +63,340 @@ def get_activity_level(activity_score):
         return {"level": "Low", "color": "#6B7280", "emoji": "💤"}
 
 
-def generate_insights(user_id):
+INSIGHTS_CACHE_TTL = 30 * 60  # stored insights older than this get refreshed
+INSIGHTS_REFRESH_LOCK_TTL = 60  # seconds
+
+
+def insights_cache_key(user_id):
+    """Cache key for a user's generated insights"""
+    return f"user_insights:{user_id}"
+
+
+def invalidate_insights(user_id):
+    """Mark the user's stored insights stale so the next read refreshes them"""
+    cache.delete(insights_cache_key(user_id))
+    db.session.execute(
+        update(UserInsights)
+        .where(UserInsights.user_id == user_id)
+        .values(generated_at=None)
+    )
+    db.session.commit()
+
+
+CONNECTIONS_COUNT_CACHE_TTL = 60  # seconds
+
+
+def get_connections_count(user_id):
     """
-    Generate AI-like insights based on user's activity patterns
-    Uses pattern matching and statistical analysis (no external ML)
+    Accepted connections for a user, memoized per request (g) and
+    briefly in the shared cache - the dashboard fires several analytics
+    calls at once that all need it
     """
-    insights = []
-    user = User.query.get(user_id)
-    
-    # Insight 1: Best posting day
-    posts_by_day = db.session.query(
-        func.strftime('%w', Post.posted_at).label('day'),
-        func.count(Post.id).label('count'),
-        func.avg(Post.likes_count).label('avg_likes')
-    ).filter(
+    key = f"conn_cnt:{user_id}"
+
+    if key in g:
+        return g.get(key)
+
+    count = cache.get(key)
+    if count is None:
+        count = db.session.execute(
+            select(func.count(Connection.id)).where(
+                or_(
+                    Connection.requester_id == user_id,
+                    Connection.receiver_id == user_id
+                ),
+                Connection.status == "accepted"
+            )
+        ).scalar_one()
+        cache.set(key, count, timeout=CONNECTIONS_COUNT_CACHE_TTL)
+
+    setattr(g, key, count)
+    return count
+
+
+IMPACT_CACHE_TTL = 10 * 60  # 10 minutes
+
+
+def impact_cache_key(user_id):
+    """Cache key for a user's impact counters"""
+    return f"impact:{user_id}"
+
+
+def invalidate_impact(user_id):
+    """Drop cached impact counters so the next request recomputes them"""
+    cache.delete(impact_cache_key(user_id))
+
+
+def get_impact_counters(user_id):
+    """
+    All-time impact counters for a user, computed in a single query and
+    cached for IMPACT_CACHE_TTL seconds (dropped early by invalidate_impact)
+    """
+    key = impact_cache_key(user_id)
+    counters = cache.get(key)
+    if counters is not None:
+        return counters
+
+    # Unique users who viewed your posts (HyperLogLog estimate when enabled)
+    if current_app.config.get("ANALYTICS_APPROX_DISTINCT") and db.engine.dialect.name == "postgresql":
+        distinct_viewers = cast(
+            func.hll_cardinality(func.hll_add_agg(func.hll_hash_integer(PostView.viewer_id))),
+            db.Integer
+        )
+    else:
+        distinct_viewers = func.count(func.distinct(PostView.viewer_id))
+
+    people_reached = select(distinct_viewers).join(Post, PostView.post_id == Post.id).where(
         Post.student_id == user_id,
-        Post.posted_at >= datetime.datetime.utcnow() - datetime.timedelta(days=30)
-    ).group_by('day').all()
-    
-    if posts_by_day:
-        best_day = max(posts_by_day, key=lambda x: x.avg_likes)
-        day_name = calendar.day_name[int(best_day.day)]
+        PostView.viewer_id != user_id
+    ).scalar_subquery()
+
+    # Questions you answered
+    questions_answered = select(func.count(Comment.id)).where(
+        Comment.student_id == user_id,
+        Comment.post_type.in_(["question", "problem"])
+    ).scalar_subquery()
+
+    # Questions you solved
+    questions_solved = select(func.count(Comment.id)).where(
+        Comment.student_id == user_id,
+        Comment.is_solution == True
+    ).scalar_subquery()
+
+    # Resources shared
+    resources_shared = select(func.count(Post.id)).where(
+        Post.student_id == user_id,
+        Post.post_type == "resource"
+    ).scalar_subquery()
+
+    # Times bookmarked by others
+    times_bookmarked = select(func.count(Bookmark.id)).where(
+        Bookmark.post_owner_id == user_id,
+        Bookmark.student_id != user_id
+    ).scalar_subquery()
+
+    row = db.session.execute(
+        select(
+            people_reached.label("people_reached"),
+            questions_answered.label("questions_answered"),
+            questions_solved.label("questions_solved"),
+            resources_shared.label("resources_shared"),
+            times_bookmarked.label("times_bookmarked")
+        )
+    ).mappings().one()
+
+    counters = {name: value or 0 for name, value in row.items()}
+    cache.set(key, counters, timeout=IMPACT_CACHE_TTL)
+
+    return counters
+
+
+POST_ANALYTICS_CACHE_TTL = 60  # seconds
+
+
+def get_post_breakdown(post_id):
+    """
+    View timeline (last 30 days), reaction breakdown and bookmark count
+    for a post, fetched as one UNION ALL of (kind, key, count) rows and
+    cached for POST_ANALYTICS_CACHE_TTL seconds
+    """
+    key = f"post_ana:{post_id}"
+    breakdown = cache.get(key)
+    if breakdown is not None:
+        return breakdown
+
+    thirty_days_ago = datetime.date.today() - datetime.timedelta(days=30)
+
+    views_by_day = select(
+        literal("view", String).label("kind"),
+        cast(PostView.view_date, String).label("key"),
+        func.count(PostView.id).label("count")
+    ).where(
+        PostView.post_id == post_id,
+        PostView.view_date >= thirty_days_ago
+    ).group_by(PostView.view_date)
+
+    reactions = select(
+        literal("reaction", String),
+        PostReaction.reaction_type,
+        func.count(PostReaction.id)
+    ).where(PostReaction.post_id == post_id).group_by(
+        PostReaction.reaction_type
+    )
+
+    bookmarks = select(
+        literal("bookmarks", String),
+        literal("", String),
+        func.count(Bookmark.id)
+    ).where(Bookmark.post_id == post_id)
+
+    rows = db.session.execute(union_all(views_by_day, reactions, bookmarks)).all()
+
+    breakdown = {"timeline": [], "reactions": {}, "bookmarks": 0}
+    for kind, row_key, count in rows:
+        if kind == "view":
+            breakdown["timeline"].append({"date": row_key, "views": count})
+        elif kind == "reaction":
+            breakdown["reactions"][row_key] = count
+        else:
+            breakdown["bookmarks"] = count
+
+    breakdown["timeline"].sort(key=lambda day: day["date"])  # ISO dates sort chronologically
+
+    cache.set(key, breakdown, timeout=POST_ANALYTICS_CACHE_TTL)
+    return breakdown
+
+
+def activity_version_key(user_id):
+    """Cache key for a user's activity version token"""
+    return f"activity_version:{user_id}"
+
+
+def bump_activity_version(user_id):
+    """Mark the user's activity as changed (new ETags for activity-based endpoints)"""
+    version = datetime.datetime.utcnow().timestamp()
+    cache.set(activity_version_key(user_id), version, timeout=0)  # No expiry
+    return version
+
+
+def activity_version(user_id):
+    """
+    Opaque token that changes whenever the user's own activity does;
+    a missing (evicted) token is simply re-issued, invalidating old ETags
+    """
+    version = cache.get(activity_version_key(user_id))
+    if version is None:
+        version = bump_activity_version(user_id)
+    return version
+
+
+def invalidate_user_analytics(user_id):
+    """Drop everything derived from the user's own posts/comments (call after commit)"""
+    invalidate_insights(user_id)
+    invalidate_impact(user_id)
+    bump_activity_version(user_id)
+
+
+def bounded_int_arg(name, default, minimum, maximum):
+    """Integer query arg clamped to [minimum, maximum]"""
+    value = request.args.get(name, default, type=int)
+    return max(minimum, min(value, maximum))
+
+
+def make_etag(*parts):
+    """Short ETag from the values a response depends on"""
+    return hashlib.blake2s(":".join(map(str, parts)).encode()).hexdigest()
+
+
+def not_modified(etag):
+    """304 response if the client already holds this ETag, else None"""
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+        response.set_etag(etag)
+        return response
+    return None
+
+
+HEATMAP_MAX_DAYS = 365  # Max 1 year
+
+CLIENT_CACHE_MAX_AGE = 60  # seconds
+
+
+def private_cache(response, max_age=CLIENT_CACHE_MAX_AGE):
+    """Let the browser (not shared proxies) reuse a per-user response briefly"""
+    response.cache_control.private = True
+    response.cache_control.max_age = max_age
+    return response
+
+
+BEST_DAY_CACHE_TTL = 60 * 60  # 1 hour
+
+
+def best_day_cache_key(user_id):
+    """Cache key for a user's best-posting-day stats (rolls over daily)"""
+    return f"best_day:{user_id}:{datetime.date.today().isoformat()}"
+
+
+def _best_posting_day(user_id):
+    """
+    Best posting day over the last 30 days plus avg response time
+
+    Memoized per (user, day) for BEST_DAY_CACHE_TTL seconds so repeat
+    dashboard visits skip the grouped scan; it is not dropped by
+    invalidate_insights, so comments don't force a recompute
+
+    Returns:
+        dict (empty if the user has no recent posts)
+    """
+    key = best_day_cache_key(user_id)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    # Avg response time (Insight 2) rides along as a scalar subquery so both
+    # insights share one round-trip
+    answered_post = aliased(Post)
+    response_time = select(
+        func.avg(
+            func.julianday(Comment.posted_at) - func.julianday(answered_post.posted_at)
+        ) * 24
+    ).select_from(Comment).join(
+        answered_post, Comment.post_id == answered_post.id
+    ).where(
+        Comment.student_id == user_id
+    ).scalar_subquery()
+
+    # Best day picked in SQL (ORDER BY ... LIMIT 1); the mean of the per-day
+    # averages comes along as a window over the grouped rows
+    day_avg_likes = func.avg(Post.likes_count)
+    row = db.session.execute(
+        select(
+            Post.posted_dow.label('day'),
+            day_avg_likes.label('avg_likes'),
+            func.avg(day_avg_likes).over().label('overall_avg_likes'),
+            response_time.label('avg_response_time')
+        ).where(
+            Post.student_id == user_id,
+            Post.posted_dow.isnot(None),  # Rows predating posted_dow (see backfill-posted-dow)
+            Post.posted_at >= datetime.datetime.utcnow() - datetime.timedelta(days=30)
+        ).group_by(Post.posted_dow).order_by(
+            day_avg_likes.desc(), Post.posted_dow
+        ).limit(1)
+    ).mappings().first()
+
+    if row:
+        best_day = dict(row)
+    else:
+        # Separate response-time query only when there were no recent posts
+        best_day = {
+            "day": None,
+            "avg_likes": None,
+            "overall_avg_likes": None,
+            "avg_response_time": db.session.execute(select(response_time)).scalar()
+        }
+
+    cache.set(key, best_day, timeout=BEST_DAY_CACHE_TTL)
+    return best_day
+
+
+def _timing_insights(user_id):
+    """Insights 1 & 2: best posting day and average response time"""
+    insights = []
+
+    best_day = _best_posting_day(user_id)
+
+    if best_day["avg_likes"]:
+        day_name = calendar.day_name[int(best_day["day"])]
         insights.append({
             "type": "timing",
             "icon": "📅",
             "title": "Best Posting Day",
-            "message": f"Your posts get {best_day.avg_likes:.1f} likes on {day_name}s - {int(best_day.avg_likes / (sum(p.avg_likes for p in posts_by_day) / len(posts_by_day)) * 100)}% above average!",
+            "message": f"Your posts get {best_day['avg_likes']:.1f} likes on {day_name}s - {int(best_day['avg_likes'] / best_day['overall_avg_likes'] * 100)}% above average!",
             "actionable": f"Try posting more on {day_name}s"
         })
-    avg_response_time = db.session.query(
-        func.avg(
-            func.julianday(Comment.posted_at) - func.julianday(Post.posted_at)
-        ) * 24
-    ).join(Post, Comment.post_id == Post.id).filter(
-        Comment.student_id == user_id
-    ).scalar()
-   
-        
-    
+
+    avg_response_time = best_day["avg_response_time"]
+
     if avg_response_time and avg_response_time < 3:
         insights.append({
             "type": "engagement",
@@ -100,74 +405,128 @@ def generate_insights(user_id):
             "message": f"You respond to posts in {avg_response_time:.1f} hours on average - faster than 75% of users!",
             "actionable": "Your quick responses help build reputation"
         })
-    
-    # Insight 3: Trending content
+
+    return insights
+
+
+def _trending_insights(user_id):
+    """Insight 3: trending content"""
     recent_post = Post.query.filter_by(student_id=user_id).order_by(
         Post.posted_at.desc()
     ).first()
     
-    if recent_post:
-        views_today = PostView.query.filter(
-            PostView.post_id == recent_post.id,
-            PostView.view_date == datetime.date.today()
-        ).count()
-        
-        if views_today >= 20:
-            insights.append({
-                "type": "trending",
-                "icon": "🔥",
-                "title": "You're Trending!",
-                "message": f'Your post "{recent_post.title[:40]}..." has {views_today} views today!',
-                "actionable": "Keep engaging with comments to maintain momentum"
-            })
-    
-    # Insight 4: Badge progress
-    from routes.student.badges import calculate_badge_progress
-    
-    # Check closest badge
-    earned_badge_ids = [ub.badge_id for ub in UserBadge.query.filter_by(user_id=user_id).all()]
-    from models import Badge
-    unearned = Badge.query.filter(Badge.id.notin_(earned_badge_ids), Badge.is_active == True).all()
-    
-    closest_badge = None
-    highest_progress = 0
-    
-    for badge in unearned:
-        progress = calculate_badge_progress(user_id, badge.id)
-        if progress and progress.get("percentage", 0) > highest_progress:
-            highest_progress = progress["percentage"]
-            closest_badge = (badge, progress)
-    
-    if closest_badge and highest_progress >= 50:
-        badge, progress = closest_badge
-        insights.append({
-            "type": "achievement",
-            "icon": "🏆",
-            "title": "Badge Almost Unlocked!",
-            "message": f"{badge.icon} {progress['remaining']} more {progress['type']} to earn '{badge.name}'",
-            "actionable": f"You're {progress['percentage']:.0f}% there!"
-        })
+    if not recent_post:
+        return []
+
+    # Denormalized counter - stale if the last view was on an earlier day
+    views_today = (
+        recent_post.views_today or 0
+        if recent_post.views_today_date == datetime.date.today() else 0
+    )
     
-    # Insight 5: Audience engagement
-    dept_rank = db.session.query(func.count(User.id)).join(StudentProfile).filter(
-        StudentProfile.department == StudentProfile.query.filter_by(user_id=user_id).first().department,
-        User.reputation > user.reputation
-    ).scalar() + 1
+    if views_today < 20:
+        return []
+
+    return [{
+        "type": "trending",
+        "icon": "🔥",
+        "title": "You're Trending!",
+        "message": f'Your post "{recent_post.title[:40]}..." has {views_today} views today!',
+        "actionable": "Keep engaging with comments to maintain momentum"
+    }]
+
+
+def _badge_insights(user_id):
+    """Insight 4: badge progress"""
+    from routes.student.badges import get_badge_counters, get_closest_badge
+
+    # Check closest badge (percentages ranked in SQL, top one returned)
+    closest_badge = get_closest_badge(user_id, get_badge_counters(user_id))
     
-    total_dept_users = db.session.query(func.count(User.id)).join(StudentProfile).filter(
-        StudentProfile.department == StudentProfile.query.filter_by(user_id=user_id).first().department
-    ).scalar()
+    if not closest_badge or closest_badge[1]["percentage"] < 50:
+        return []
+
+    badge, progress = closest_badge
+    return [{
+        "type": "achievement",
+        "icon": "🏆",
+        "title": "Badge Almost Unlocked!",
+        "message": f"{badge.icon} {progress['remaining']} more {progress['type']} to earn '{badge.name}'",
+        "actionable": f"You're {progress['percentage']:.0f}% there!"
+    }]
+
+
+def _department_insights(user_id, reputation):
+    """Insight 5: audience engagement (department percentile)"""
+    # Department size and rank in one round-trip (department resolved as a subquery)
+    user_department = select(StudentProfile.department).where(
+        StudentProfile.user_id == user_id
+    ).scalar_subquery()
+
+    dept_stats = db.session.execute(
+        select(
+            func.count(User.id).label('total'),
+            func.sum(case((User.reputation > reputation, 1), else_=0)).label('above')
+        ).join(StudentProfile).where(
+            StudentProfile.department == user_department
+        )
+    ).one()
+
+    total_dept_users = dept_stats.total or 0
+    dept_rank = (dept_stats.above or 0) + 1
+
+    percentile = round((1 - (dept_rank / total_dept_users)) * 100) if total_dept_users else 0
     
-    percentile = round((1 - (dept_rank / total_dept_users)) * 100)
+    if percentile < 90:
+        return []
+
+    return [{
+        "type": "achievement",
+        "icon": "🌟",
+        "title": "Top Contributor",
+        "message": f"You're in the top {100-percentile}% of your department!",
+        "actionable": "Your expertise is valued by the community"
+    }]
+
+
+def _run_with_app_context(app, fn, *args):
+    """Run fn in its own app context (and so its own DB session)"""
+    with app.app_context():
+        return fn(*args)
+
+
+def generate_insights(user_id):
+    """
+    Generate AI-like insights based on user's activity patterns
+    Uses pattern matching and statistical analysis (no external ML)
     
-    if percentile >= 90:
-        insights.append({
-            "type": "achievement",
-            "icon": "🌟",
-            "title": "Top Contributor",
-            "message": f"You're in the top {100-percentile}% of your department!",
-            "actionable": "Your expertise is valued by the community"
-        })
+    The independent insight queries run concurrently on a thread pool
+    (one session per worker) except on SQLite, which serializes access
+    """
+    # Only the two columns the insights need - no User entity is built
+    user = db.session.execute(
+        select(User.reputation, User.login_streak).where(User.id == user_id)
+    ).one()
+
+    jobs = [
+        (_timing_insights, (user_id,)),
+        (_trending_insights, (user_id,)),
+        (_badge_insights, (user_id,)),
+        (_department_insights, (user_id, user.reputation)),
+    ]
+
+    if db.engine.dialect.name == "sqlite":
+        results = [fn(*args) for fn, args in jobs]
+    else:
+        app = current_app._get_current_object()
+        with ThreadPoolExecutor(max_workers=len(jobs)) as executor:
+            futures = [
+                executor.submit(_run_with_app_context, app, fn, *args)
+                for fn, args in jobs
+            ]
+            results = [f.result() for f in futures]
+
+    insights = [insight for result in results for insight in result]
     
     # Insight 6: Consistency check
     if user.login_streak >= 7:
@@ -182,25 +541,326 @@ def generate_insights(user_id):
     return insights[:5]  # Return top 5 insights
 
 
-def get_average_user_stats():
-    """Calculate platform-wide average statistics"""
-    total_users = User.query.filter_by(status="approved").count()
+def refresh_insights(user_id):
+    """Regenerate and store a user's insights; returns (insights, generated_at)"""
+    insights = generate_insights(user_id)
+    generated_at = datetime.datetime.utcnow()
+
+    db.session.merge(UserInsights(user_id=user_id, payload=insights, generated_at=generated_at))
+    db.session.commit()
+
+    cache.set(
+        insights_cache_key(user_id),
+        (insights, generated_at),
+        timeout=INSIGHTS_CACHE_TTL
+    )
+    return insights, generated_at
+
+
+# Background refreshes for stale insights - small, so a burst of stale
+# reads can't tie up the database
+_insights_executor = ThreadPoolExecutor(max_workers=2)
+
+
+def schedule_insights_refresh(user_id):
+    """
+    Refresh a user's insights in the background (at most one in flight per user)
+    SQLite serializes writers, so there it runs inline and returns the result
+    """
+    if not cache.add(f"insights_refreshing:{user_id}", 1, timeout=INSIGHTS_REFRESH_LOCK_TTL):
+        return None
+
+    if db.engine.dialect.name == "sqlite":
+        return refresh_insights(user_id)
+
+    app = current_app._get_current_object()
+    _insights_executor.submit(_run_with_app_context, app, refresh_insights, user_id)
+    return None
+
+
+def get_user_insights(user_id):
+    """
+    A user's stored insights as (insights, generated_at)
+
+    Only the very first request computes inline; stale rows are served
+    as-is while a background refresh replaces them
+    """
+    cached = cache.get(insights_cache_key(user_id))
+    if cached is not None:
+        return cached
+
+    stored = (
+        select(UserInsights.payload, UserInsights.generated_at)
+        .where(UserInsights.user_id == user_id)
+    )
+    row = db.session.execute(stored).first()
+
+    if row is None:
+        try:
+            return refresh_insights(user_id)
+        except IntegrityError:
+            # A concurrent first request stored the row first; use theirs
+            db.session.rollback()
+            row = db.session.execute(stored).one()
+
+    fresh_after = datetime.datetime.utcnow() - datetime.timedelta(seconds=INSIGHTS_CACHE_TTL)
+    if row.generated_at is None or row.generated_at < fresh_after:
+        refreshed = schedule_insights_refresh(user_id)
+        if refreshed is not None:
+            return refreshed
+    else:
+        remaining = (row.generated_at - fresh_after).total_seconds()
+        cache.set(insights_cache_key(user_id), tuple(row), timeout=max(int(remaining), 1))
+
+    return row.payload, row.generated_at
+
+
+@analytics_bp.cli.command("refresh-insights")
+def refresh_insights_command():
+    """Regenerate insights for users active in the last day (run every 30 min from cron)"""
+    since = datetime.datetime.utcnow() - datetime.timedelta(days=1)
+    user_ids = db.session.execute(
+        select(User.id).where(User.last_active >= since)
+    ).scalars().all()
+
+    for user_id in user_ids:
+        refresh_insights(user_id)
+
+    print(f"✅ Insights refreshed for {len(user_ids)} users!")
+
+
+AVG_STATS_CACHE_KEY = "platform_avg_stats"
+AVG_STATS_CACHE_TTL = 24 * 60 * 60  # 1 day - refreshed nightly
+
+
+def compute_average_user_stats():
+    """Calculate platform-wide average statistics (single query)"""
+    accepted_connections = select(func.count(Connection.id)).where(
+        Connection.status == "accepted"
+    ).scalar_subquery()
+
+    row = db.session.execute(
+        select(
+            func.sum(case((User.status == "approved", 1), else_=0)).label("approved"),
+            func.avg(User.total_posts).label("avg_posts"),
+            func.avg(User.reputation).label("avg_reputation"),
+            func.avg(User.total_helpful).label("avg_helpful"),
+            accepted_connections.label("accepted_connections")
+        )
+    ).one()
+
+    total_users = row.approved or 0
     
     if total_users == 0:
         return {}
     
     avg_stats = {
-        "avg_posts": db.session.query(func.avg(User.total_posts)).scalar() or 0,
-        "avg_reputation": db.session.query(func.avg(User.reputation)).scalar() or 0,
-        "avg_helpful": db.session.query(func.avg(User.total_helpful)).scalar() or 0,
-        "avg_connections": db.session.query(
-            func.count(Connection.id)
-        ).filter(Connection.status == "accepted").scalar() / total_users if total_users > 0 else 0
+        "avg_posts": row.avg_posts or 0,
+        "avg_reputation": row.avg_reputation or 0,
+        "avg_helpful": row.avg_helpful or 0,
+        "avg_connections": (row.accepted_connections or 0) / total_users
     }
     
     return avg_stats
 
 
+def refresh_average_user_stats():
+    """Recompute platform averages and store them in the cache"""
+    avg_stats = compute_average_user_stats()
+    cache.set(AVG_STATS_CACHE_KEY, avg_stats, timeout=AVG_STATS_CACHE_TTL)
+    return avg_stats
+
+
+def get_average_user_stats():
+    """Platform-wide average statistics, served from cache when available"""
+    avg_stats = cache.get(AVG_STATS_CACHE_KEY)
+    if avg_stats is None:
+        avg_stats = refresh_average_user_stats()
+    return avg_stats
+
+
+@analytics_bp.cli.command("refresh-stats")
+def refresh_stats_command():
+    """Refresh cached platform averages (run nightly from cron)"""
+    refresh_average_user_stats()
+    print("✅ Platform average stats refreshed!")
+
+
+@analytics_bp.cli.command("backfill-posted-dow")
+def backfill_posted_dow_command():
+    """Fill Post.posted_dow for posts created before the column existed"""
+    posts = Post.query.filter(Post.posted_dow.is_(None)).yield_per(500)
+    updated = 0
+    for post in posts:
+        post.posted_dow = post.posted_at.weekday()
+        updated += 1
+    db.session.commit()
+    print(f"✅ Backfilled posted_dow for {updated} posts!")
+
+
+@analytics_bp.cli.command("backfill-post-denorm")
+def backfill_post_denorm_command():
+    """Fill Comment.post_type and Bookmark.post_owner_id for rows created before the columns existed"""
+    comments = db.session.execute(
+        update(Comment).where(Comment.post_type.is_(None)).values(
+            post_type=select(Post.post_type).where(
+                Post.id == Comment.post_id
+            ).scalar_subquery()
+        )
+    ).rowcount
+
+    bookmarks = db.session.execute(
+        update(Bookmark).where(Bookmark.post_owner_id.is_(None)).values(
+            post_owner_id=select(Post.student_id).where(
+                Post.id == Bookmark.post_id
+            ).scalar_subquery()
+        )
+    ).rowcount
+
+    db.session.commit()
+    print(f"✅ Backfilled {comments} comments and {bookmarks} bookmarks!")
+
+
+WEEKLY_STATS_FIELDS = (
+    "views", "helpful", "rep_change", "activity_score",
+    "badges_earned", "posts_created", "new_connections"
+)
+
+
+def weekly_stat_columns(user_id, since):
+    """
+    Rolling-window stats as labeled scalar subqueries (one per field)
+
+    user_id may be a plain id, or User.id to correlate the subqueries
+    with each row of a SELECT over users
+    """
+    return [
+        select(func.count(PostView.id)).join(
+            Post, PostView.post_id == Post.id
+        ).where(
+            Post.student_id == user_id,
+            PostView.viewed_at >= since
+        ).scalar_subquery().label("views"),
+
+        select(func.count(PostReaction.id)).join(
+            Post, PostReaction.post_id == Post.id
+        ).where(
+            Post.student_id == user_id,
+            PostReaction.reaction_type == "helpful",
+            PostReaction.reacted_at >= since
+        ).scalar_subquery().label("helpful"),
+
+        select(func.coalesce(func.sum(ReputationHistory.points_change), 0)).where(
+            ReputationHistory.user_id == user_id,
+            ReputationHistory.created_at >= since
+        ).scalar_subquery().label("rep_change"),
+
+        select(func.coalesce(func.sum(UserActivity.activity_score), 0)).where(
+            UserActivity.user_id == user_id,
+            UserActivity.activity_date >= since.date()
+        ).scalar_subquery().label("activity_score"),
+
+        select(func.count(UserBadge.id)).where(
+            UserBadge.user_id == user_id,
+            UserBadge.earned_at >= since
+        ).scalar_subquery().label("badges_earned"),
+
+        select(func.count(Post.id)).where(
+            Post.student_id == user_id,
+            Post.posted_at >= since
+        ).scalar_subquery().label("posts_created"),
+
+        select(func.count(Connection.id)).where(
+            or_(
+                Connection.requester_id == user_id,
+                Connection.receiver_id == user_id
+            ),
+            Connection.status == "accepted",
+            Connection.responded_at >= since
+        ).scalar_subquery().label("new_connections"),
+    ]
+
+
+def refresh_weekly_stats():
+    """Rebuild user_weekly_stats for the 7 days up to now (one INSERT ... SELECT)"""
+    now = datetime.datetime.utcnow()
+    since = now - datetime.timedelta(days=7)
+
+    db.session.execute(delete(UserWeeklyStats))
+    db.session.execute(
+        insert(UserWeeklyStats).from_select(
+            ["user_id", "week_start", *WEEKLY_STATS_FIELDS, "refreshed_at"],
+            select(
+                User.id,
+                literal(since.date()),
+                *weekly_stat_columns(User.id, since),
+                literal(now)
+            ).where(User.role == "student")
+        )
+    )
+    db.session.commit()
+
+
+def get_weekly_stats(user_id):
+    """
+    A user's stats for the last 7 days
+
+    Reads today's precomputed row when the nightly rollup has run,
+    otherwise (new users, job not run yet) computes it live
+    """
+    since = datetime.datetime.utcnow() - datetime.timedelta(days=7)
+
+    row = db.session.execute(
+        select(*[getattr(UserWeeklyStats, field) for field in WEEKLY_STATS_FIELDS]).where(
+            UserWeeklyStats.user_id == user_id,
+            UserWeeklyStats.week_start == since.date()
+        )
+    ).mappings().first()
+
+    if row is None:
+        row = db.session.execute(
+            select(*weekly_stat_columns(user_id, since))
+        ).mappings().one()
+
+    return {field: row[field] or 0 for field in WEEKLY_STATS_FIELDS}
+
+
+@analytics_bp.cli.command("refresh-weekly-stats")
+def refresh_weekly_stats_command():
+    """Rebuild the rolling weekly stats rollup (run nightly from cron)"""
+    refresh_weekly_stats()
+    print("✅ Weekly user stats refreshed!")
+
+
+def refresh_department_ranks():
+    """Rebuild department_leaderboard with RANK() per department (one INSERT ... SELECT)"""
+    rank = func.rank().over(
+        partition_by=StudentProfile.department,
+        order_by=User.reputation.desc()
+    )
+
+    db.session.execute(delete(DepartmentRank))
+    db.session.execute(
+        insert(DepartmentRank).from_select(
+            ["user_id", "department", "rank", "refreshed_at"],
+            select(
+                User.id,
+                StudentProfile.department,
+                rank,
+                literal(datetime.datetime.utcnow())
+            ).join(StudentProfile).where(User.status == "approved")
+        )
+    )
+    db.session.commit()
+
+
+@analytics_bp.cli.command("refresh-department-ranks")
+def refresh_department_ranks_command():
+    """Rebuild the department leaderboard ranks (run every few minutes from cron)"""
+    refresh_department_ranks()
+    print("✅ Department ranks refreshed!")
+
+
 # ============================================================================
 # ANALYTICS ENDPOINTS
 # ============================================================================
@@ -213,49 +873,45 @@ def get_analytics_overview(current_user):
     Shows weekly impact, rank, reputation change, activity level
     """
     try:
-        profile = StudentProfile.query.filter_by(user_id=current_user.id).first()
+        # This week's stats (nightly rollup)
+        weekly = get_weekly_stats(current_user.id)
         
-        # Calculate week-over-week changes
-        week_ago = datetime.datetime.utcnow() - datetime.timedelta(days=7)
-        two_weeks_ago = datetime.datetime.utcnow() - datetime.timedelta(days=14)
+        user_department = select(StudentProfile.department).where(
+            StudentProfile.user_id == current_user.id
+        ).scalar_subquery()
         
-        # This week's stats
-        this_week_views = db.session.query(func.count(PostView.id)).join(
-            Post, PostView.post_id == Post.id
-        ).filter(
-            Post.student_id == current_user.id,
-            PostView.viewed_at >= week_ago
-        ).scalar() or 0
+        user_class = select(StudentProfile.class_name).where(
+            StudentProfile.user_id == current_user.id
+        ).scalar_subquery()
         
-        this_week_helpful = db.session.query(func.count(PostReaction.id)).join(
-            Post, PostReaction.post_id == Post.id
-        ).filter(
-            Post.student_id == current_user.id,
-            PostReaction.reaction_type == "helpful",
-            PostReaction.reacted_at >= week_ago
-        ).scalar() or 0
-        
-        this_week_rep = db.session.query(
-            func.sum(ReputationHistory.points_change)
-        ).filter(
-            ReputationHistory.user_id == current_user.id,
-            ReputationHistory.created_at >= week_ago
-        ).scalar() or 0
-        
-        # Department rank
-        dept_rank = db.session.query(func.count(User.id)).join(StudentProfile).filter(
-            StudentProfile.department == profile.department,
-            User.reputation > current_user.reputation,
-            User.status == "approved"
-        ).scalar() + 1
-        
-        # Activity level this week
-        week_activity = db.session.query(
-            func.sum(UserActivity.activity_score)
-        ).filter(
-            UserActivity.user_id == current_user.id,
-            UserActivity.activity_date >= datetime.date.today() - datetime.timedelta(days=7)
-        ).scalar() or 0
+        # Department rank (precomputed leaderboard)
+        leaderboard_rank = select(DepartmentRank.rank).where(
+            DepartmentRank.user_id == current_user.id
+        ).scalar_subquery()
+        
+        profile = db.session.execute(
+            select(
+                user_department.label("department"),
+                user_class.label("class_name"),
+                leaderboard_rank.label("dept_rank")
+            )
+        ).one()
+        
+        dept_rank = profile.dept_rank
+        if dept_rank is None:
+            # Not on the leaderboard yet (new or unapproved user) - count live
+            dept_rank = db.session.execute(
+                select(func.count(User.id)).join(StudentProfile).where(
+                    StudentProfile.department == user_department,
+                    User.reputation > current_user.reputation,
+                    User.status == "approved"
+                )
+            ).scalar() + 1
+        
+        this_week_views = weekly["views"]
+        this_week_helpful = weekly["helpful"]
+        this_week_rep = weekly["rep_change"]
+        week_activity = weekly["activity_score"]
         
         activity_level = get_activity_level(week_activity)
         
@@ -279,8 +935,8 @@ def get_analytics_overview(current_user):
                 "quick_facts": {
                     "joined_at": current_user.joined_at.isoformat(),
                     "days_active": (datetime.datetime.utcnow() - current_user.joined_at).days,
-                    "department": profile.department if profile else None,
-                    "class_level": profile.class_name if profile else None
+                    "department": profile.department,
+                    "class_level": profile.class_name
                 }
             }
         })
@@ -298,73 +954,80 @@ def get_activity_heatmap(current_user):
     Shows daily activity score with color intensity
     """
     try:
-        days = request.args.get("days", 90, type=int)
-        days = min(days, 365)  # Max 1 year
+        days = bounded_int_arg("days", 90, 1, HEATMAP_MAX_DAYS)
+        
+        # Past days never change - only new activity, a new day or the streak can
+        etag = make_etag(
+            current_user.id, activity_version(current_user.id),
+            days, datetime.date.today(), current_user.login_streak
+        )
+        cached_response = not_modified(etag)
+        if cached_response is not None:
+            return cached_response
         
         start_date = datetime.date.today() - datetime.timedelta(days=days)
         
+        # Intensity level (0-4 for 5 color levels) is bucketed in SQL
+        score = func.coalesce(UserActivity.activity_score, 0)
+        level = case(
+            (score == 0, 0),
+            (score <= 5, 1),
+            (score <= 15, 2),
+            (score <= 30, 3),
+            else_=4
+        )
+        
         # Get all activity records
-        activities = UserActivity.query.filter(
-            UserActivity.user_id == current_user.id,
-            UserActivity.activity_date >= start_date
-        ).order_by(UserActivity.activity_date.asc()).all()
-        
-        # Create date map
-        activity_map = {}
-        for activity in activities:
-            activity_map[activity.activity_date.isoformat()] = {
-                "date": activity.activity_date.isoformat(),
-                "score": activity.activity_score,
-                "posts": activity.posts_created,
-                "comments": activity.comments_created,
-                "messages": activity.messages_sent,
-                "helpful": activity.helpful_count,
-                "level": 0  # Will calculate based on score
-            }
+        activities = db.session.execute(
+            select(
+                UserActivity.activity_date,
+                score.label("score"),
+                func.coalesce(UserActivity.posts_created, 0).label("posts"),
+                func.coalesce(UserActivity.comments_created, 0).label("comments"),
+                func.coalesce(UserActivity.messages_sent, 0).label("messages"),
+                func.coalesce(UserActivity.helpful_count, 0).label("helpful"),
+                level.label("level")
+            ).where(
+                UserActivity.user_id == current_user.id,
+                UserActivity.activity_date >= start_date
+            )
+        ).mappings()
         
-        # Fill in missing dates with zero activity
-        current_date = start_date
-        while current_date <= datetime.date.today():
-            date_str = current_date.isoformat()
-            if date_str not in activity_map:
-                activity_map[date_str] = {
-                    "date": date_str,
-                    "score": 0,
-                    "posts": 0,
-                    "comments": 0,
-                    "messages": 0,
-                    "helpful": 0,
-                    "level": 0
-                }
-            else:
-                # Calculate intensity level (0-4 for 5 color levels)
-                score = activity_map[date_str]["score"]
-                if score == 0:
-                    level = 0
-                elif score <= 5:
-                    level = 1
-                elif score <= 15:
-                    level = 2
-                elif score <= 30:
-                    level = 3
-                else:
-                    level = 4
-                activity_map[date_str]["level"] = level
-            
-            current_date += datetime.timedelta(days=1)
+        activity_by_date = {row["activity_date"]: row for row in activities}
+        no_activity = {"score": 0, "posts": 0, "comments": 0, "messages": 0, "helpful": 0, "level": 0}
         
-        # Convert to sorted list
-        heatmap_data = sorted(activity_map.values(), key=lambda x: x["date"])
+        # Walk the range once in date order: build the dense series (days
+        # without a record have zero activity) and the summary stats together
+        heatmap_data = []
+        total_active_days = 0
+        total_score = 0
+        best_day = None
         
-        # Calculate summary stats
-        total_active_days = sum(1 for day in heatmap_data if day["score"] > 0)
-        total_score = sum(day["score"] for day in heatmap_data)
-        avg_daily_score = round(total_score / days, 1) if days > 0 else 0
+        day = start_date
+        today = datetime.date.today()
+        while day <= today:
+            row = activity_by_date.get(day, no_activity)
+            entry = {
+                "date": day.isoformat(),
+                "score": row["score"],
+                "posts": row["posts"],
+                "comments": row["comments"],
+                "messages": row["messages"],
+                "helpful": row["helpful"],
+                "level": row["level"]
+            }
+            heatmap_data.append(entry)
+            
+            total_score += entry["score"]
+            total_active_days += entry["score"] > 0
+            if best_day is None or entry["score"] > best_day["score"]:
+                best_day = entry
+            
+            day += datetime.timedelta(days=1)
         
-        # Find best day
-        best_day = max(heatmap_data, key=lambda x: x["score"]) if heatmap_data else None
+        avg_daily_score = round(total_score / days, 1) if days > 0 else 0
         
-        return jsonify({
+        response = jsonify({
             "status": "success",
             "data": {
                 "heatmap": heatmap_data,
@@ -378,6 +1041,8 @@ def get_activity_heatmap(current_user):
                 }
             }
         })
+        response.set_etag(etag)
+        return response
         
     except Exception as e:
         current_app.logger.error(f"Activity heatmap error: {str(e)}")
@@ -391,36 +1056,52 @@ def get_engagement_stats(current_user):
     Detailed engagement breakdown for posts, comments, threads
     """
     try:
-        # Post engagement
-        post_stats = db.session.query(
-            func.count(Post.id).label('total'),
-            func.sum(Post.views).label('total_views'),
-            func.sum(Post.likes_count).label('total_likes'),
-            func.sum(Post.comments_count).label('total_comments'),
-            func.avg(Post.likes_count).label('avg_likes'),
-            func.avg(Post.views).label('avg_views')
-        ).filter(Post.student_id == current_user.id).first()
-        
-        # Best performing post
-        best_post = Post.query.filter_by(student_id=current_user.id).order_by(
-            (Post.likes_count + Post.comments_count).desc()
-        ).first()
-        
-        # Comment engagement
-        comment_stats = db.session.query(
-            func.count(Comment.id).label('total'),
-            func.sum(Comment.likes_count).label('total_likes'),
-            func.count(case((Comment.is_solution == True, 1))).label('solutions')
-        ).filter(Comment.student_id == current_user.id).first()
-        
-        # Thread participation
-        thread_stats = db.session.query(
-            func.count(ThreadMember.id).label('joined'),
-            func.sum(ThreadMember.messages_sent).label('messages_sent')
-        ).filter(ThreadMember.student_id == current_user.id).first()
-        
-        threads_created = Thread.query.filter_by(creator_id=current_user.id).count()
-        
+        # Aggregate-only reads: plain Core selects skip ORM identity-map
+        # bookkeeping, and nothing here needs a flush first
+        with db.session.no_autoflush:
+            # Post engagement
+            post_stats = db.session.execute(
+                select(
+                    func.count(Post.id).label('total'),
+                    func.sum(Post.views).label('total_views'),
+                    func.sum(Post.likes_count).label('total_likes'),
+                    func.sum(Post.comments_count).label('total_comments'),
+                    func.avg(Post.likes_count).label('avg_likes'),
+                    func.avg(Post.views).label('avg_views')
+                ).where(Post.student_id == current_user.id)
+            ).one()
+
+            # Best performing post
+            best_post = db.session.execute(
+                select(Post.id, Post.title, Post.likes_count,
+                       Post.comments_count, Post.views)
+                .where(Post.student_id == current_user.id)
+                .order_by((Post.likes_count + Post.comments_count).desc())
+                .limit(1)
+            ).first()
+
+            # Comment engagement
+            comment_stats = db.session.execute(
+                select(
+                    func.count(Comment.id).label('total'),
+                    func.sum(Comment.likes_count).label('total_likes'),
+                    func.count(case((Comment.is_solution == True, 1))).label('solutions')
+                ).where(Comment.student_id == current_user.id)
+            ).one()
+
+            # Thread participation
+            thread_stats = db.session.execute(
+                select(
+                    func.count(ThreadMember.id).label('joined'),
+                    func.sum(ThreadMember.messages_sent).label('messages_sent'),
+                    select(func.count(Thread.id))
+                    .where(Thread.creator_id == current_user.id)
+                    .scalar_subquery().label('created')
+                ).where(ThreadMember.student_id == current_user.id)
+            ).one()
+
+        threads_created = thread_stats.created or 0
+
         # Calculate engagement rate
         engagement_rate = calculate_engagement_rate(
             post_stats.total_views or 0,
@@ -474,46 +1155,16 @@ def get_impact_metrics(current_user):
     People reached, questions answered, resources shared
     """
     try:
-        # Unique users who viewed your posts
-        people_reached = db.session.query(
-            func.count(func.distinct(PostView.viewer_id))
-        ).join(Post, PostView.post_id == Post.id).filter(
-            Post.student_id == current_user.id,
-            PostView.viewer_id != current_user.id
-        ).scalar() or 0
-        
-        # Questions you answered
-        questions_answered = Comment.query.join(Post).filter(
-            Comment.student_id == current_user.id,
-            Post.post_type.in_(["question", "problem"])
-        ).count()
-        
-        # Questions you solved
-        questions_solved = Comment.query.filter_by(
-            student_id=current_user.id,
-            is_solution=True
-        ).count()
-        
-        # Resources shared
-        resources_shared = Post.query.filter_by(
-            student_id=current_user.id,
-            post_type="resource"
-        ).count()
-        
-        # Times bookmarked by others
-        times_bookmarked = Bookmark.query.join(Post).filter(
-            Post.student_id == current_user.id,
-            Bookmark.student_id != current_user.id
-        ).count()
+        impact = get_impact_counters(current_user.id)
+        
+        people_reached = impact["people_reached"]
+        questions_answered = impact["questions_answered"]
+        questions_solved = impact["questions_solved"]
+        resources_shared = impact["resources_shared"]
+        times_bookmarked = impact["times_bookmarked"]
         
         # Active connections
-        connections_count = Connection.query.filter(
-            or_(
-                Connection.requester_id == current_user.id,
-                Connection.receiver_id == current_user.id
-            ),
-            Connection.status == "accepted"
-        ).count()
+        connections_count = get_connections_count(current_user.id)
         
         # Study buddies helped (future feature - placeholder)
         study_buddies = 0
@@ -552,15 +1203,15 @@ def get_insights(current_user):
     AI-like insights and personalized suggestions
     """
     try:
-        insights = generate_insights(current_user.id)
+        insights, generated_at = get_user_insights(current_user.id)
         
-        return jsonify({
+        return private_cache(jsonify({
             "status": "success",
             "data": {
                 "insights": insights,
-                "generated_at": datetime.datetime.utcnow().isoformat()
+                "generated_at": generated_at.isoformat() if generated_at else None
             }
-        })
+        }))
         
     except Exception as e:
         current_app.logger.error(f"Insights error: {str(e)}")
@@ -581,17 +1232,11 @@ def get_comparison_stats(current_user):
         rep_multiplier = (current_user.reputation / avg_stats["avg_reputation"]) if avg_stats["avg_reputation"] > 0 else 0
         helpful_multiplier = (current_user.total_helpful / avg_stats["avg_helpful"]) if avg_stats["avg_helpful"] > 0 else 0
         
-        connections_count = Connection.query.filter(
-            or_(
-                Connection.requester_id == current_user.id,
-                Connection.receiver_id == current_user.id
-            ),
-            Connection.status == "accepted"
-        ).count()
+        connections_count = get_connections_count(current_user.id)
         
         connections_multiplier = (connections_count / avg_stats["avg_connections"]) if avg_stats["avg_connections"] > 0 else 0
         
-        return jsonify({
+        return private_cache(jsonify({
             "status": "success",
             "data": {
                 "your_stats": {
@@ -625,7 +1270,7 @@ def get_comparison_stats(current_user):
                     }
                 }
             }
-        })
+        }))
         
     except Exception as e:
         current_app.logger.error(f"Comparison stats error: {str(e)}")
@@ -647,31 +1292,8 @@ def get_post_analytics(current_user, post_id):
         if post.student_id != current_user.id:
             return error_response("Can only view analytics for your own posts", 403)
         
-        # View timeline (last 30 days)
-        thirty_days_ago = datetime.date.today() - datetime.timedelta(days=30)
-        
-        views_by_day = db.session.query(
-            PostView.view_date,
-            func.count(PostView.id).label('views')
-        ).filter(
-            PostView.post_id == post_id,
-            PostView.view_date >= thirty_days_ago
-        ).group_by(PostView.view_date).order_by(PostView.view_date.asc()).all()
-        
-        timeline = [{
-            "date": v.view_date.isoformat(),
-            "views": v.views
-        } for v in views_by_day]
-        
-        # Reaction breakdown
-        reactions = db.session.query(
-            PostReaction.reaction_type,
-            func.count(PostReaction.id).label('count')
-        ).filter(PostReaction.post_id == post_id).group_by(
-            PostReaction.reaction_type
-        ).all()
-        
-        reaction_breakdown = {r.reaction_type: r.count for r in reactions}
+        # View timeline, reaction breakdown and bookmarks in one round-trip
+        breakdown = get_post_breakdown(post_id)
         
         # Engagement rate
         engagement_rate = calculate_engagement_rate(
@@ -693,11 +1315,11 @@ def get_post_analytics(current_user, post_id):
                     "likes": post.likes_count,
                     "dislikes": post.dislikes_count,
                     "comments": post.comments_count,
-                    "bookmarks": post.bookmarks,
+                    "bookmarks": breakdown["bookmarks"],
                     "engagement_rate": engagement_rate
                 },
-                "reactions": reaction_breakdown,
-                "timeline": timeline
+                "reactions": breakdown["reactions"],
+                "timeline": breakdown["timeline"]
             }
         })
         
@@ -713,48 +1335,24 @@ def get_weekly_summary(current_user):
     Weekly digest data (for email/notification)
     """
     try:
-        week_ago = datetime.datetime.utcnow() - datetime.timedelta(days=7)
-        
-        # New reputation earned
-        rep_change = db.session.query(
-            func.sum(ReputationHistory.points_change)
-        ).filter(
-            ReputationHistory.user_id == current_user.id,
-            ReputationHistory.created_at >= week_ago
-        ).scalar() or 0
-        
-        # New badges earned
-        new_badges = UserBadge.query.filter(
-            UserBadge.user_id == current_user.id,
-            UserBadge.earned_at >= week_ago
-        ).count()
-        
-        # Posts created this week
-        posts_created = Post.query.filter(
-            Post.student_id == current_user.id,
-            Post.posted_at >= week_ago
-        ).count()
-        
-        # People helped
-        helpful_this_week = db.session.query(func.count(PostReaction.id)).join(
-            Post, PostReaction.post_id == Post.id
-        ).filter(
-            Post.student_id == current_user.id,
-            PostReaction.reaction_type == "helpful",
-            PostReaction.reacted_at >= week_ago
-        ).scalar() or 0
+        # Others' reactions/connections also count, so the tag rolls over each minute
+        etag = make_etag(
+            current_user.id, activity_version(current_user.id),
+            datetime.datetime.utcnow().strftime("%Y-%m-%dT%H:%M")
+        )
+        cached_response = not_modified(etag)
+        if cached_response is not None:
+            return cached_response
         
-        # New connections
-        new_connections = Connection.query.filter(
-            or_(
-                Connection.requester_id == current_user.id,
-                Connection.receiver_id == current_user.id
-            ),
-            Connection.status == "accepted",
-            Connection.responded_at >= week_ago
-        ).count()
+        weekly = get_weekly_stats(current_user.id)
         
-        return jsonify({
+        rep_change = weekly["rep_change"]
+        new_badges = weekly["badges_earned"]
+        posts_created = weekly["posts_created"]
+        helpful_this_week = weekly["helpful"]
+        new_connections = weekly["new_connections"]
+        
+        response = jsonify({
             "status": "success",
             "data": {
                 "period": "last_7_days",
@@ -768,58 +1366,127 @@ def get_weekly_summary(current_user):
                 "message": f"Great week! You earned {rep_change} reputation and helped {helpful_this_week} people! 🎉"
             }
         })
+        response.set_etag(etag)
+        return response
         
     except Exception as e:
         current_app.logger.error(f"Weekly summary error: {str(e)}")
         return error_response("Failed to load weekly summary")
 
 
-@analytics_bp.route("/analytics/export", methods=["GET"])
-@token_required
-def export_analytics(current_user):
+EXPORT_BATCH_SIZE = 1000
+EXPORT_MAX_ROWS = 10000
+
+EXPORT_FIELDS = {
+    "activity": [
+        "date", "posts_created", "comments_created", "messages_sent",
+        "helpful_count", "activity_score"
+    ],
+    "reputation": [
+        "id", "date", "action", "points_change", "reputation_before", "reputation_after"
+    ],
+    "posts": [
+        "id", "title", "post_type", "posted_at", "views", "likes",
+        "comments", "bookmarks", "is_solved"
+    ],
+    "overview": ["metric", "value"],
+}
+
+
+# Types large enough to page through with ?after_id=<last record id>
+PAGINATED_EXPORTS = ("reputation", "posts")
+
+
+def _export_records(export_type, user, limit, after_id=None):
     """
-    Export analytics data as CSV
-    Returns JSON that frontend can convert to CSV
+    Yield export records one at a time, fetching rows in batches
+    Paginated types resume after the record with id after_id
     """
-    try:
-        export_type = request.args.get("type", "overview")
-        
-        if export_type == "activity":
-            # Export activity heatmap
-            ninety_days_ago = datetime.date.today() - datetime.timedelta(days=90)
-            activities = UserActivity.query.filter(
-                UserActivity.user_id == current_user.id,
+    if export_type == "activity":
+        # Export activity heatmap
+        ninety_days_ago = datetime.date.today() - datetime.timedelta(days=90)
+        rows = db.session.execute(
+            select(
+                UserActivity.activity_date,
+                UserActivity.posts_created,
+                UserActivity.comments_created,
+                UserActivity.messages_sent,
+                UserActivity.helpful_count,
+                UserActivity.activity_score
+            ).where(
+                UserActivity.user_id == user.id,
                 UserActivity.activity_date >= ninety_days_ago
-            ).order_by(UserActivity.activity_date.asc()).all()
-            
-            export_data = [{
+            ).order_by(UserActivity.activity_date.asc()).limit(limit).execution_options(
+                stream_results=True, yield_per=EXPORT_BATCH_SIZE
+            )
+        )
+        
+        for a in rows:
+            yield {
                 "date": a.activity_date.isoformat(),
                 "posts_created": a.posts_created,
                 "comments_created": a.comments_created,
                 "messages_sent": a.messages_sent,
                 "helpful_count": a.helpful_count,
                 "activity_score": a.activity_score
-            } for a in activities]
-            
-        elif export_type == "reputation":
-            # Export reputation history
-            history = ReputationHistory.query.filter_by(
-                user_id=current_user.id
-            ).order_by(ReputationHistory.created_at.desc()).all()
-            
-            export_data = [{
+            }
+    
+    elif export_type == "reputation":
+        # Export reputation history
+        rows = db.session.execute(
+            select(
+                ReputationHistory.id,
+                ReputationHistory.created_at,
+                ReputationHistory.action,
+                ReputationHistory.points_change,
+                ReputationHistory.reputation_before,
+                ReputationHistory.reputation_after
+            ).where(
+                ReputationHistory.user_id == user.id,
+                ReputationHistory.id < after_id if after_id else True
+            ).order_by(ReputationHistory.id.desc()).limit(limit).execution_options(
+                stream_results=True, yield_per=EXPORT_BATCH_SIZE
+            )
+        )
+        
+        for h in rows:
+            yield {
+                "id": h.id,
                 "date": h.created_at.isoformat(),
                 "action": h.action,
                 "points_change": h.points_change,
                 "reputation_before": h.reputation_before,
                 "reputation_after": h.reputation_after
-            } for h in history]
-            
-        elif export_type == "posts":
-            # Export post performance
-            posts = Post.query.filter_by(student_id=current_user.id).all()
-            
-            export_data = [{
+            }
+    
+    elif export_type == "posts":
+        # Export post performance
+        # (Post.bookmarks is the bookmarks relationship, not a counter column - count the rows)
+        bookmarks_count = select(func.count(Bookmark.id)).where(
+            Bookmark.post_id == Post.id
+        ).scalar_subquery()
+        
+        rows = db.session.execute(
+            select(
+                Post.id,
+                Post.title,
+                Post.post_type,
+                Post.posted_at,
+                Post.views,
+                Post.likes_count,
+                Post.comments_count,
+                bookmarks_count.label("bookmarks"),
+                Post.is_solved
+            ).where(
+                Post.student_id == user.id,
+                Post.id > after_id if after_id else True
+            ).order_by(Post.id.asc()).limit(limit).execution_options(
+                stream_results=True, yield_per=EXPORT_BATCH_SIZE
+            )
+        )
+        
+        for p in rows:
+            yield {
                 "id": p.id,
                 "title": p.title,
                 "post_type": p.post_type,
@@ -829,36 +1496,94 @@ def export_analytics(current_user):
                 "comments": p.comments_count,
                 "bookmarks": p.bookmarks,
                 "is_solved": p.is_solved
-            } for p in posts]
-            
-        else:
-            # Overview export
-            export_data = [{
-                "metric": "Total Posts",
-                "value": current_user.total_posts
-            }, {
-                "metric": "Total Reputation",
-                "value": current_user.reputation
-            }, {
-                "metric": "Reputation Level",
-                "value": current_user.reputation_level
-            }, {
-                "metric": "Total Helpful",
-                "value": current_user.total_helpful
-            }, {
-                "metric": "Login Streak",
-                "value": current_user.login_streak
-            }]
+            }
+    
+    else:
+        # Overview export
+        yield from [{
+            "metric": "Total Posts",
+            "value": user.total_posts
+        }, {
+            "metric": "Total Reputation",
+            "value": user.reputation
+        }, {
+            "metric": "Reputation Level",
+            "value": user.reputation_level
+        }, {
+            "metric": "Total Helpful",
+            "value": user.total_helpful
+        }, {
+            "metric": "Login Streak",
+            "value": user.login_streak
+        }]
+
+
+def _stream_csv(fieldnames, records):
+    """Yield CSV text chunk by chunk (header first) without buffering the export"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fieldnames)
+    
+    writer.writeheader()
+    for count, record in enumerate(records, 1):
+        writer.writerow(record)
+        if count % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    
+    yield buffer.getvalue()
+
+
+@analytics_bp.route("/analytics/export", methods=["GET"])
+@token_required
+def export_analytics(current_user):
+    """
+    Export analytics data as CSV
+    Returns JSON that frontend can convert to CSV, or a streamed
+    CSV file with ?format=csv
+    
+    Query params:
+    - type: overview, activity, reputation, posts
+    - format: json (default) or csv
+    - limit: max rows (1 to EXPORT_MAX_ROWS)
+    - after_id: resume a reputation/posts export after this record id
+      (JSON responses return it as pagination.next_after_id)
+    """
+    try:
+        export_type = request.args.get("type", "overview")
+        export_format = request.args.get("format", "json")
+        limit = bounded_int_arg("limit", EXPORT_MAX_ROWS, 1, EXPORT_MAX_ROWS)
+        after_id = request.args.get("after_id", type=int)
+        
+        records = _export_records(export_type, current_user, limit, after_id)
+        
+        if export_format == "csv":
+            fieldnames = EXPORT_FIELDS.get(export_type, EXPORT_FIELDS["overview"])
+            return Response(
+                stream_with_context(_stream_csv(fieldnames, records)),
+                mimetype="text/csv",
+                headers={
+                    "Content-Disposition": f"attachment; filename=studyhub_{export_type}.csv"
+                }
+            )
+        
+        records = list(records)
+        has_more = export_type in PAGINATED_EXPORTS and len(records) == limit
         
         return jsonify({
             "status": "success",
             "data": {
                 "export_type": export_type,
-                "records": export_data,
+                "records": records,
+                "pagination": {
+                    "limit": limit,
+                    "max_limit": EXPORT_MAX_ROWS,
+                    "next_after_id": records[-1]["id"] if has_more else None
+                },
                 "generated_at": datetime.datetime.utcnow().isoformat()
             }
         })
         
     except Exception as e:
         current_app.logger.error(f"Export analytics error: {str(e)}")
-        return error_response("Failed to export analytics")    
\ No newline at end of file
+        return error_response("Failed to export analytics")
@@ -1,9 +1,9 @@
 # app.py
 from flask import Flask, render_template
-from extensions import db, login_manager, mail
+from extensions import db, mail, cache, orjson, OrjsonProvider
 import os
 from routes.student import student_bp
-from models import User
+from routes.student.helpers import cookie_user
 
 
 # --- Configuration class ---
@@ -11,6 +11,18 @@ class Config:
     SECRET_KEY = os.environ.get("SECRET_KEY")
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'sqlite:///school.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Keep warm connections and a larger compiled-statement cache; pool sizing
+    # only applies to server databases (SQLite uses its own pools)
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        "pool_pre_ping": True,
+        "pool_recycle": 1800,
+        "query_cache_size": 1200,
+        **({} if SQLALCHEMY_DATABASE_URI.startswith("sqlite") else {
+            "pool_size": int(os.environ.get("DB_POOL_SIZE", 20)),
+            "max_overflow": int(os.environ.get("DB_MAX_OVERFLOW", 40)),
+        }),
+    }
     UPLOAD_FOLDER = os.environ.get("UPLOAD_FOLDER", "static/upload")
 
     # Email settings
@@ -25,6 +37,23 @@ class Config:
     MAIL_PASSWORD = os.environ.get("MAIL_PASSWORD")
     MAIL_DEFAULT_SENDER = os.environ.get("MAIL_DEFAULT_SENDER")
     BREVO_API_KEY = os.environ.get("BREVO_API_KEY")
+
+    # Cache settings (set CACHE_TYPE=RedisCache and CACHE_REDIS_URL in production)
+    CACHE_TYPE = os.environ.get("CACHE_TYPE", "SimpleCache")
+    CACHE_REDIS_URL = os.environ.get("CACHE_REDIS_URL", "redis://localhost:6379/0")
+    CACHE_DEFAULT_TIMEOUT = 300
+
+    # Approximate "people reached" with the Postgres hll extension (CREATE EXTENSION hll)
+    ANALYTICS_APPROX_DISTINCT = os.environ.get("ANALYTICS_APPROX_DISTINCT", "false").lower() == "true"
+
+    # Auth cookies are HTTPS-only unless explicitly disabled (local http dev)
+    AUTH_COOKIE_SECURE = os.environ.get("AUTH_COOKIE_SECURE", "true").lower() == "true"
+
+    # Make unplanned lazy loads raise on endpoints that opt in (catch N+1s in dev/QA)
+    SQLA_RAISELOAD = os.environ.get("SQLA_RAISELOAD", "false").lower() == "true"
+
+    # Early Adopter cutoff base; filled from the first user's join date on first use
+    PLATFORM_LAUNCH_DATE = None
   
 
 
@@ -33,19 +62,21 @@ def create_app():
     app = Flask(__name__)
     app.config.from_object(Config)
 
+    # Faster jsonify() when orjson is installed
+    if orjson is not None:
+        app.json = OrjsonProvider(app)
+
 
     # Initialize extensions
     db.init_app(app)
     mail.init_app(app)
-    login_manager.init_app(app)
-
-    # Configure login manager
-    login_manager.login_view = "student.student_auth.login"
-    login_manager.login_message_category = "info"
+    cache.init_app(app)
 
-    @login_manager.user_loader
-    def load_user(user_id):
-        return User.query.get(int(user_id))
+    # Templates get current_user from the JWT cookie (auth no longer uses
+    # Flask-Login sessions)
+    @app.context_processor
+    def inject_current_user():
+        return {"current_user": cookie_user()}
 
     # Register blueprints
     app.register_blueprint(student_bp, url_prefix="/student")
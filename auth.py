@@ -2,14 +2,23 @@
 # FIXED: Proper email verification flow and added missing endpoints
 from flask import Blueprint, request, jsonify, redirect, url_for, current_app, make_response, render_template
 from werkzeug.security import generate_password_hash, check_password_hash
-from flask_login import login_user, logout_user
+from sqlalchemy import select, exists, inspect
+from sqlalchemy.orm import aliased, joinedload, load_only, raiseload
 import re
+import hmac
+import secrets
+
+try:
+    from argon2 import PasswordHasher
+    from argon2.exceptions import VerificationError, InvalidHashError
+except ImportError:  # Optional - passwords fall back to Werkzeug's hashes
+    PasswordHasher = None
 
 from models import User, StudentProfile
-from extensions import db
-from utils import generate_verification_token, send_verification_email, verify_token
+from extensions import db, cache
+from utils import generate_verification_token, send_verification_email_async, verify_token
 from .helpers import (
-    generate_tokens_for_user, decode_token,
+    generate_tokens_for_user, decode_token, forget_token, rate_limit,
     success_response, error_response
 )
 
@@ -29,6 +38,60 @@ DEPARTMENTS = [
 
 CLASS_LEVELS = ["100 Level", "200 Level", "300 Level", "400 Level", "500 Level"]
 
+EMAIL_RE = re.compile(r'^[^\s@]+@[^\s@]+\.[^\s@]+$')
+USERNAME_RE = re.compile(r'^[a-z0-9]{3,20}$')
+
+USERNAME_CACHE_TTL = 30  # seconds
+
+
+def username_cache_key(username):
+    """Cache key for whether a username is taken"""
+    return f"uname:{username}"
+
+# pin placeholder until the user completes registration
+PENDING_PIN = "PENDING_VERIFICATION"
+
+# Argon2id tuned to roughly 50-100 ms per hash (64 MiB, 3 passes)
+password_hasher = PasswordHasher(
+    time_cost=3, memory_cost=65536, parallelism=1
+) if PasswordHasher else None
+
+
+# ============================================================================
+# PASSWORD HASHING
+# ============================================================================
+def hash_password(password):
+    """Argon2id hash when argon2-cffi is installed, Werkzeug's default otherwise"""
+    if password_hasher:
+        return password_hasher.hash(password)
+    return generate_password_hash(password)
+
+
+def verify_password(stored_hash, password):
+    """Check a password against an Argon2 hash or a legacy Werkzeug one"""
+    if stored_hash.startswith("$argon2"):
+        if not password_hasher:
+            return False
+        try:
+            return password_hasher.verify(stored_hash, password)
+        except (VerificationError, InvalidHashError):
+            return False
+    return check_password_hash(stored_hash, password)
+
+
+# Verified against when there is no real hash to check, so unknown and
+# pending accounts cost the same as a wrong password
+DUMMY_PASSWORD_HASH = hash_password(secrets.token_urlsafe(16))
+
+
+def password_needs_rehash(stored_hash):
+    """True for legacy Werkzeug hashes, or Argon2 hashes with old parameters"""
+    if not password_hasher:
+        return False
+    if not stored_hash.startswith("$argon2"):
+        return True
+    return password_hasher.check_needs_rehash(stored_hash)
+
 
 # ============================================================================
 # REGISTER
@@ -56,40 +119,37 @@ def register():
         if department not in DEPARTMENTS:
             return error_response("Invalid department")
 
-        email_pattern = r'^[^\s@]+@[^\s@]+\.[^\s@]+$'
-        if not re.match(email_pattern, email):
+        if not EMAIL_RE.match(email):
             return error_response("Invalid email format")
 
         existing_user = User.query.filter_by(email=email).first()
         if existing_user:
             return error_response("Email already registered")
 
+        # Profile cascades with the user - both INSERTs go out in one flush
         new_user = User(
             name=full_name,
             email=email,
             role="student",
-            pin="PENDING_VERIFICATION",
+            pin=PENDING_PIN,
             status="pending_verification",
-            email_verified=False
+            email_verified=False,
+            student_profile=StudentProfile(
+                full_name=full_name,
+                class_name=class_level,
+                department=department,
+                date_of_birth=None,
+                status="incomplete"
+            )
         )
         db.session.add(new_user)
-        db.session.flush()
-
-        student_profile = StudentProfile(
-            user_id=new_user.id,
-            full_name=full_name,
-            class_name=class_level,
-            department=department,
-            date_of_birth=None,
-            pin="PENDING_VERIFICATION",
-            status="incomplete"
-        )
-        db.session.add(student_profile)
         db.session.commit()
 
-        token = generate_verification_token(email)
+        # Identity key survives the commit, so reading the id needs no refresh query
+        user_id, = inspect(new_user).identity
+        token = generate_verification_token(user_id)
         verification_url = url_for("student.student_auth.verify_email", token=token, _external=True)
-        send_verification_email(email, verification_url)
+        send_verification_email_async(email, verification_url)
 
         return success_response(
             "Registration started! Check your email to continue.",
@@ -115,14 +175,16 @@ def verify_email(token):
 def verify_email_api(token):
     """API endpoint for email verification"""
     try:
-        email = verify_token(token)
-        if not email:
+        user_id = verify_token(token)
+        if not user_id:
             return error_response("Verification link expired or invalid")
 
-        user = User.query.filter_by(email=email).first()
+        user = db.session.get(User, user_id)
         if not user:
             return error_response("User not found")
 
+        email = user.email
+
         if user.email_verified and user.status == "approved":
             return success_response(
                 "Email already verified!",
@@ -145,6 +207,7 @@ def verify_email_api(token):
 # CHECK USERNAME AVAILABILITY (NEW)
 # ============================================================================
 @auth_bp.route("/check-username", methods=["POST"])
+@rate_limit(20, per=60)
 def check_username():
     """Check if username is available"""
     try:
@@ -152,21 +215,27 @@ def check_username():
         username = data.get("username", "").strip().lower()
         
         if not username:
-            return error_response("Username required"), 400
+            return error_response("Username required", 400)
         
-        if not re.match(r'^[a-z0-9]{3,20}$', username):
-            return error_response("Invalid username format"), 400
+        if not USERNAME_RE.match(username):
+            return error_response("Invalid username format", 400)
         
-        existing = User.query.filter_by(username=username).first()
+        # Forms check on every keystroke - answer repeats from the cache
+        taken = cache.get(username_cache_key(username))
+        if taken is None:
+            taken = db.session.execute(
+                select(exists().where(User.username == username))
+            ).scalar()
+            cache.set(username_cache_key(username), taken, timeout=USERNAME_CACHE_TTL)
         
-        if existing:
-            return error_response("Username taken"), 409
+        if taken:
+            return error_response("Username taken", 409)
         
         return success_response("Username available", data={"available": True})
         
     except Exception as e:
         current_app.logger.error(f"Check username error: {str(e)}")
-        return error_response("Check failed"), 500
+        return error_response("Check failed", 500)
 
 
 # ============================================================================
@@ -194,29 +263,37 @@ def complete_registration():
             return error_response("Passwords do not match"), 400
         if len(password) < 6:
             return error_response("Password must be at least 6 characters"), 400
-        if not re.match(r'^[a-z0-9]{3,20}$', username):
+        if not USERNAME_RE.match(username):
             return error_response("Username must be 3-20 lowercase letters and numbers only"), 400
 
-        user = User.query.filter_by(email=email, email_verified=True).first()
-        if not user:
+        # Verified user, their profile and whether the username is taken - one query
+        username_owner = aliased(User)
+        row = db.session.execute(
+            select(
+                User,
+                exists().where(username_owner.username == username).label("username_taken")
+            )
+            .options(joinedload(User.student_profile))
+            .where(User.email == email, User.email_verified == True)
+        ).first()
+        if not row:
             return error_response("User not found or email not verified"), 404
 
-        existing_username = User.query.filter_by(username=username).first()
-        if existing_username:
+        user, username_taken = row
+        if username_taken:
             return error_response("Username already taken"), 409
 
-        hashed_password = generate_password_hash(password)
-        user.pin = hashed_password
+        user.pin = hash_password(password)  # the only copy - profiles reference User
         user.username = username
         user.status = "approved"
 
-        student_profile = StudentProfile.query.filter_by(user_id=user.id).first()
+        student_profile = user.student_profile
         if student_profile:
-            student_profile.pin = hashed_password
             student_profile.username = username
             student_profile.status = "active"
 
         db.session.commit()
+        cache.delete(username_cache_key(username))
 
         return success_response(
             f"Registration complete! Welcome, @{username}!",
@@ -249,24 +326,48 @@ def login():
         if not username_or_email or not password:
             return error_response("Username/Email and password required")
 
-        user = User.query.filter(
-            (User.username == username_or_email) | (User.email == username_or_email)
-        ).first()
+        # Exactly the columns login needs; any other attribute or relationship
+        # access raises instead of issuing a hidden lazy load
+        user = db.session.execute(
+            select(User)
+            .options(
+                load_only(
+                    User.id, User.pin, User.email, User.email_verified,
+                    User.username, User.status, User.name, User.role,
+                    raiseload=True
+                ),
+                raiseload("*")
+            )
+            # Usernames can't contain "@", so one unique-index probe decides
+            .where(
+                User.email == username_or_email if "@" in username_or_email
+                else User.username == username_or_email
+            )
+        ).scalars().first()
 
-        if not user or not check_password_hash(user.pin, password):
+        # Always run one full hash verification so response time doesn't
+        # reveal whether the account exists or is still pending
+        pending = user is not None and hmac.compare_digest(user.pin or "", PENDING_PIN)
+        stored_hash = user.pin if user and not pending else DUMMY_PASSWORD_HASH
+        password_ok = verify_password(stored_hash, password)
+
+        if not user or pending or not password_ok:
             return error_response("Invalid credentials")
 
         if not user.email_verified:
             return error_response("Please verify your email first")
-        if user.pin == "PENDING_VERIFICATION":
-            return error_response("Please complete your registration")
         if not user.username:
             return error_response("Please complete your registration")
         if user.status != "approved":
             return error_response("Your registration is incomplete")
 
+        # Upgrade PBKDF2 hashes from before Argon2 on the next good login
+        if password_needs_rehash(user.pin):
+            user.pin = hash_password(password)
+            db.session.commit()
+
+        # JWT cookies only - no server-side login session to write
         access_token, refresh_token = generate_tokens_for_user(user)
-        login_user(user)
 
         response = make_response(success_response(
             f"Welcome back, @{user.username}!",
@@ -281,10 +382,11 @@ def login():
             }
         ))
 
+        secure = current_app.config.get("AUTH_COOKIE_SECURE", True)
         response.set_cookie("access_token", access_token, httponly=True,
-                            secure=False, samesite="Lax", max_age=30 * 60)
+                            secure=secure, samesite="Strict", max_age=30 * 60)
         response.set_cookie("refresh_token", refresh_token, httponly=True,
-                            secure=False, samesite="Lax", max_age=7 * 24 * 60 * 60)
+                            secure=secure, samesite="Strict", max_age=7 * 24 * 60 * 60)
 
         return response
 
@@ -300,10 +402,13 @@ def login():
 def logout():
     """Logout user"""
     try:
-        logout_user()
+        access_token = request.cookies.get("access_token")
+        if access_token:
+            forget_token(access_token)
         if request.method == "GET":
-            return redirect(url_for("student_auth.login"))
-        response = make_response(success_response("Logged out successfully"))
+            response = redirect(url_for("student_auth.login"))
+        else:
+            response = make_response(success_response("Logged out successfully"))
         response.set_cookie("access_token", "", max_age=0)
         response.set_cookie("refresh_token", "", max_age=0)
         return response
@@ -17,20 +17,22 @@ Badge Rarity:
 """
 
 from flask import Blueprint, request, jsonify, current_app
-from sqlalchemy import func, desc, and_, or_
+from sqlalchemy import func, desc, and_, or_, case, exists, select, insert, update
 import datetime
 
 from models import (
     User, Badge, UserBadge, Post, Comment, Thread, ThreadMember,
-    PostReaction, Connection, UserActivity, Notification
+    PostReaction, Connection, UserActivity, Notification, LARGE_THREAD_MEMBERS
 )
-from extensions import db
+from extensions import db, cache
 from routes.student.helpers import (
     token_required, success_response, error_response
 )
 
 badges_bp = Blueprint("student_badges", __name__)
 
+MAX_FEATURED_BADGES = 3
+
 
 # ============================================================================
 # BADGE DEFINITIONS (Seed Data)
@@ -206,28 +208,174 @@ BADGE_DEFINITIONS = [
 # HELPER FUNCTIONS
 # ============================================================================
 
+BADGE_SEED_FIELDS = ("name", "description", "icon", "category", "rarity", "criteria")
+
+
 def seed_badges():
     """
     Seed initial badges into database
     Run once during setup
     """
-    for badge_data in BADGE_DEFINITIONS:
-        existing = Badge.query.filter_by(name=badge_data["name"]).first()
-        if not existing:
-            badge = Badge(
-                name=badge_data["name"],
-                description=badge_data["description"],
-                icon=badge_data["icon"],
-                category=badge_data["category"],
-                rarity=badge_data["rarity"],
-                criteria=badge_data["criteria"]
-            )
-            db.session.add(badge)
+    names = [badge_data["name"] for badge_data in BADGE_DEFINITIONS]
+    existing = set(db.session.execute(
+        select(Badge.name).where(Badge.name.in_(names))
+    ).scalars())
+
+    missing = [
+        {field: badge_data[field] for field in BADGE_SEED_FIELDS}
+        for badge_data in BADGE_DEFINITIONS
+        if badge_data["name"] not in existing
+    ]
+    if missing:
+        db.session.execute(insert(Badge), missing)  # one multi-row INSERT
     
     db.session.commit()
+    bump_badge_catalog_version()
     print("✅ Badges seeded successfully!")
 
 
+def get_launch_date():
+    """
+    Platform launch date - PLATFORM_LAUNCH_DATE, else the first user's join
+    date, looked up once per process and kept on the app config
+    """
+    launch_date = current_app.config.get("PLATFORM_LAUNCH_DATE")
+    if launch_date is None:
+        launch_date = db.session.execute(select(func.min(User.joined_at))).scalar()
+        if launch_date is not None:
+            current_app.config["PLATFORM_LAUNCH_DATE"] = launch_date
+    return launch_date
+
+
+def is_early_adopter(user_id):
+    """Joined within 30 days of launch"""
+    launch_date = get_launch_date()
+    joined_at = db.session.execute(
+        select(User.joined_at).where(User.id == user_id)
+    ).scalar()
+
+    if not launch_date or not joined_at:
+        return False
+    return joined_at <= launch_date + datetime.timedelta(days=30)
+
+
+def department_rank(user_id, limit):
+    """
+    User's reputation rank among approved users of their department, capped
+    at limit + 1 (None without a profile)
+
+    Only "is the user in the top limit?" matters, so the scan stops after
+    limit users ahead of them instead of counting the whole department
+    """
+    from models import StudentProfile
+    profile = db.session.execute(
+        select(StudentProfile.department, User.reputation)
+        .join(User, User.id == StudentProfile.user_id)
+        .where(StudentProfile.user_id == user_id)
+    ).first()
+    if not profile:
+        return None
+
+    ahead = (
+        select(User.id).join(StudentProfile).where(
+            StudentProfile.department == profile.department,
+            User.reputation > profile.reputation,
+            User.status == "approved"
+        )
+        .limit(limit)
+        .subquery()
+    )
+    return db.session.execute(select(func.count()).select_from(ahead)).scalar() + 1
+
+
+def _counter_at_least(key):
+    """Criterion handler: counters[key] >= required"""
+    return lambda user_id, required, counters: counters[key] >= required
+
+
+def _early_adopter(user_id, required, counters):
+    # Special criteria are looked up once and memoized on counters
+    if "early_adopter" not in counters:
+        counters["early_adopter"] = is_early_adopter(user_id)
+    return counters["early_adopter"]
+
+
+def _top_of_department(user_id, required, counters):
+    key = ("department_rank", required)
+    if key not in counters:
+        counters[key] = department_rank(user_id, limit=required)
+    rank = counters[key]
+    return rank is not None and rank <= required
+
+
+# Criteria key -> handler(user_id, required, counters)
+CRITERION_HANDLERS = {
+    "posts_count": _counter_at_least("posts_count"),
+    "helpful_count": _counter_at_least("helpful_count"),
+    "solutions_count": _counter_at_least("solutions_count"),
+    "login_streak": _counter_at_least("login_streak"),
+    "connections_count": _counter_at_least("connections_count"),
+    "threads_created": _counter_at_least("threads_created"),
+    # Has at least one thread with 10+ members
+    "thread_leader": lambda user_id, required, counters: counters["threads_large"] >= 1,
+    # Has X threads with 10+ members each
+    "threads_large": _counter_at_least("threads_large"),
+    "reputation": _counter_at_least("reputation"),
+    "early_adopter": _early_adopter,
+    "department_rank": _top_of_department,
+}
+
+
+def badge_qualifies(user_id, criteria, counters):
+    """
+    Check a badge's criteria against pre-fetched counters
+    (see get_badge_counters); only the special criteria query further
+    """
+    for key, required in criteria.items():
+        handler = CRITERION_HANDLERS.get(key)
+        if handler:
+            return handler(user_id, required, counters)
+
+    return False
+
+
+def stage_badge_awards(user_id, badges):
+    """
+    Insert UserBadge + notification rows for badges (caller commits)
+
+    Each table gets one multi-row INSERT; the UserBadge rows come back
+    through RETURNING as regular ORM objects
+    """
+    user_badges = db.session.execute(
+        insert(UserBadge).returning(UserBadge),
+        [{"user_id": user_id, "badge_id": badge.id} for badge in badges]
+    ).scalars().all()
+    db.session.execute(insert(Notification), [
+        {
+            "user_id": user_id,
+            "title": f"Badge Earned: {badge.name}!",
+            "body": f"{badge.icon} {badge.description}",
+            "notification_type": "badge_earned",
+            "related_type": "badge",
+            "related_id": badge.id
+        }
+        for badge in badges
+    ])
+
+    # Denormalized copy on the user row, locked so concurrent awards can't
+    # drop each other's ids
+    user = db.session.get(User, user_id, with_for_update=True, populate_existing=True)
+    user.earned_badge_ids = sorted(set(user.earned_badge_ids or []) | {badge.id for badge in badges})
+
+    # Update badge awarded counts in one statement
+    db.session.execute(
+        update(Badge)
+        .where(Badge.id.in_([badge.id for badge in badges]))
+        .values(awarded_count=Badge.awarded_count + 1)
+    )
+    return user_badges
+
+
 def check_and_award_badge(user_id, badge_name):
     """
     Check if user qualifies for a badge and award it
@@ -235,211 +383,168 @@ def check_and_award_badge(user_id, badge_name):
     Returns:
         UserBadge if awarded, None if already has it or doesn't qualify
     """
-    # Check if already has badge
     badge = Badge.query.filter_by(name=badge_name).first()
     if not badge:
         return None
     
-    existing = UserBadge.query.filter_by(
-        user_id=user_id,
-        badge_id=badge.id
-    ).first()
-    
-    if existing:
-        return None  # Already has badge
-    
-    # Check if user meets criteria
-    user = User.query.get(user_id)
-    if not user:
+    # Check if already has badge
+    already_earned = db.session.execute(
+        select(exists().where(
+            UserBadge.user_id == user_id,
+            UserBadge.badge_id == badge.id
+        ))
+    ).scalar()
+    if already_earned:
         return None
     
-    criteria = badge.criteria
-    qualifies = False
-    
-    # Check each criteria type
-    if "posts_count" in criteria:
-        qualifies = user.total_posts >= criteria["posts_count"]
-    
-    elif "helpful_count" in criteria:
-        qualifies = user.total_helpful >= criteria["helpful_count"]
-    
-    elif "solutions_count" in criteria:
-        solutions = Comment.query.filter_by(
-            student_id=user_id,
-            is_solution=True
-        ).count()
-        qualifies = solutions >= criteria["solutions_count"]
-    
-    elif "login_streak" in criteria:
-        qualifies = user.login_streak >= criteria["login_streak"]
-    
-    elif "connections_count" in criteria:
-        connections = Connection.query.filter(
-            or_(
-                Connection.requester_id == user_id,
-                Connection.receiver_id == user_id
-            ),
-            Connection.status == "accepted"
-        ).count()
-        qualifies = connections >= criteria["connections_count"]
-    
-    elif "threads_created" in criteria:
-        threads = Thread.query.filter_by(creator_id=user_id).count()
-        qualifies = threads >= criteria["threads_created"]
-    
-    elif "thread_leader" in criteria:
-        # Has at least one thread with 10+ members
-        large_thread = Thread.query.filter(
-            Thread.creator_id == user_id,
-            Thread.member_count >= 10
-        ).first()
-        qualifies = bool(large_thread)
-    
-    elif "threads_large" in criteria:
-        # Has X threads with 10+ members each
-        large_threads = Thread.query.filter(
-            Thread.creator_id == user_id,
-            Thread.member_count >= 10
-        ).count()
-        qualifies = large_threads >= criteria["threads_large"]
-    
-    elif "reputation" in criteria:
-        qualifies = user.reputation >= criteria["reputation"]
-    
-    elif "early_adopter" in criteria:
-        # Joined within first 30 days of platform launch
-        # Assuming launch date is first user's join date
-        first_user = User.query.order_by(User.joined_at.asc()).first()
-        if first_user:
-            launch_date = first_user.joined_at
-            cutoff = launch_date + datetime.timedelta(days=30)
-            qualifies = user.joined_at <= cutoff
-    
-    elif "department_rank" in criteria:
-        # Check if user is in top X of department
-        from models import StudentProfile
-        profile = StudentProfile.query.filter_by(user_id=user_id).first()
-        if profile:
-            rank = db.session.query(func.count(User.id)).join(StudentProfile).filter(
-                StudentProfile.department == profile.department,
-                User.reputation > user.reputation,
-                User.status == "approved"
-            ).scalar() + 1
-            qualifies = rank <= criteria["department_rank"]
-    
-    # Award badge if qualified
-    if qualifies:
-        user_badge = UserBadge(
-            user_id=user_id,
-            badge_id=badge.id
-        )
-        db.session.add(user_badge)
-        
-        # Update badge awarded count
-        badge.awarded_count += 1
-        
-        # Create notification
-        notification = Notification(
-            user_id=user_id,
-            title=f"Badge Earned: {badge.name}!",
-            body=f"{badge.icon} {badge.description}",
-            notification_type="badge_earned",
-            related_type="badge",
-            related_id=badge.id
-        )
-        db.session.add(notification)
-        
-        db.session.commit()
-        
-        return user_badge
-    
-    return None
+    counters = get_badge_counters(user_id)
+    if not counters or not badge_qualifies(user_id, badge.criteria, counters):
+        return None
+
+    user_badge, = stage_badge_awards(user_id, [badge])
+    db.session.commit()
+
+    return user_badge
 
 
 def check_all_badges_for_user(user_id):
     """
     Check all possible badges for a user
     Called after significant actions (post created, streak updated, etc.)
+
+    Counters and unearned badges are fetched once, criteria are checked in
+    Python and every award goes out in a single commit
     
     Returns:
         List of newly awarded badges
     """
-    all_badges = Badge.query.filter_by(is_active=True).all()
-    awarded = []
-    
-    for badge in all_badges:
-        result = check_and_award_badge(user_id, badge.name)
-        if result:
-            awarded.append(badge)
+    counters = get_badge_counters(user_id)
+    if not counters:
+        return []
+
+    # Checked against user_badges rather than User.earned_badge_ids, which
+    # may be NULL or behind on rows that predate the column
+    candidates = db.session.execute(
+        select(Badge).where(
+            Badge.is_active == True,
+            ~exists().where(
+                UserBadge.user_id == user_id,
+                UserBadge.badge_id == Badge.id
+            )
+        )
+    ).scalars().all()
+
+    awarded = [
+        badge for badge in candidates
+        if badge_qualifies(user_id, badge.criteria, counters)
+    ]
     
     if awarded:
+        stage_badge_awards(user_id, awarded)
         db.session.commit()
     
     return awarded
 
 
-def calculate_badge_progress(user_id, badge_id):
+def get_badge_counters(user_id):
     """
-    Calculate user's progress toward a specific badge
-    
+    Fetch every counter used by badge criteria (denormalized on User)
+
     Returns:
-        dict with current/required values and percentage
+        dict keyed by criteria name, or None if user doesn't exist
     """
-    badge = Badge.query.get(badge_id)
-    user = User.query.get(user_id)
-    
-    if not badge or not user:
+    row = db.session.execute(
+        select(
+            User.total_posts,
+            User.total_helpful,
+            User.login_streak,
+            User.reputation,
+            User.total_solutions,
+            User.total_connections,
+            User.total_threads_created,
+            User.total_large_threads
+        ).where(User.id == user_id)
+    ).first()
+
+    if not row:
         return None
-    
-    criteria = badge.criteria
-    current = 0
-    required = 0
-    progress_type = ""
-    
-    if "posts_count" in criteria:
-        current = user.total_posts
-        required = criteria["posts_count"]
-        progress_type = "posts"
-    
-    elif "helpful_count" in criteria:
-        current = user.total_helpful
-        required = criteria["helpful_count"]
-        progress_type = "helpful reactions"
-    
-    elif "solutions_count" in criteria:
-        current = Comment.query.filter_by(
-            student_id=user_id,
-            is_solution=True
-        ).count()
-        required = criteria["solutions_count"]
-        progress_type = "solutions"
-    
-    elif "login_streak" in criteria:
-        current = user.login_streak
-        required = criteria["login_streak"]
-        progress_type = "day streak"
-    
-    elif "connections_count" in criteria:
-        current = Connection.query.filter(
-            or_(
-                Connection.requester_id == user_id,
-                Connection.receiver_id == user_id
-            ),
-            Connection.status == "accepted"
-        ).count()
-        required = criteria["connections_count"]
-        progress_type = "connections"
-    
-    elif "threads_created" in criteria:
-        current = Thread.query.filter_by(creator_id=user_id).count()
-        required = criteria["threads_created"]
-        progress_type = "threads created"
-    
-    elif "reputation" in criteria:
-        current = user.reputation
-        required = criteria["reputation"]
-        progress_type = "reputation points"
-    
+
+    return {
+        "posts_count": row.total_posts or 0,
+        "helpful_count": row.total_helpful or 0,
+        "solutions_count": row.total_solutions or 0,
+        "login_streak": row.login_streak or 0,
+        "connections_count": row.total_connections or 0,
+        "threads_created": row.total_threads_created or 0,
+        "threads_large": row.total_large_threads or 0,
+        "reputation": row.reputation or 0
+    }
+
+
+@badges_bp.cli.command("backfill-counters")
+def backfill_badge_counters_command():
+    """Recount the denormalized badge counters on users from source rows"""
+    db.session.execute(
+        update(User).values(
+            total_solutions=select(func.count(Comment.id)).where(
+                Comment.student_id == User.id,
+                Comment.is_solution == True
+            ).scalar_subquery(),
+            total_connections=select(func.count(Connection.id)).where(
+                or_(
+                    Connection.requester_id == User.id,
+                    Connection.receiver_id == User.id
+                ),
+                Connection.status == "accepted"
+            ).scalar_subquery(),
+            total_threads_created=select(func.count(Thread.id)).where(
+                Thread.creator_id == User.id
+            ).scalar_subquery(),
+            total_large_threads=select(func.count(Thread.id)).where(
+                Thread.creator_id == User.id,
+                Thread.member_count >= LARGE_THREAD_MEMBERS
+            ).scalar_subquery()
+        )
+    )
+
+    earned = {}
+    for user_id, badge_id in db.session.execute(
+        select(UserBadge.user_id, UserBadge.badge_id).order_by(UserBadge.badge_id)
+    ):
+        earned.setdefault(user_id, []).append(badge_id)
+    db.session.execute(update(User), [
+        {"id": user_id, "earned_badge_ids": earned.get(user_id, [])}
+        for user_id in db.session.execute(select(User.id)).scalars()
+    ])
+
+    db.session.commit()
+    print("✅ Badge counters backfilled!")
+
+
+# Trackable criteria in priority order -> progress label
+PROGRESS_TYPES = {
+    "posts_count": "posts",
+    "helpful_count": "helpful reactions",
+    "solutions_count": "solutions",
+    "login_streak": "day streak",
+    "connections_count": "connections",
+    "threads_created": "threads created",
+    "reputation": "reputation points"
+}
+
+
+def build_badge_progress(criteria, counters):
+    """
+    Calculate progress for a badge's criteria from pre-fetched counters
+
+    Returns:
+        dict with current/required values and percentage
+    """
+    for key, progress_type in PROGRESS_TYPES.items():
+        if key in criteria:
+            current = counters[key]
+            required = criteria[key]
+            break
     else:
         # Special badges (can't track progress)
         return {
@@ -449,9 +554,9 @@ def calculate_badge_progress(user_id, badge_id):
             "type": "special",
             "message": "Complete special requirements"
         }
-    
+
     percentage = min((current / required) * 100, 100) if required > 0 else 0
-    
+
     return {
         "current": current,
         "required": required,
@@ -461,6 +566,158 @@ def calculate_badge_progress(user_id, badge_id):
     }
 
 
+def badge_percentage(counters):
+    """
+    SQL expression for a badge's completion percentage (capped at 100),
+    computed from pre-fetched counters and the badge's JSON criteria
+    """
+    percentage = case(
+        *[
+            (
+                Badge.criteria[key].as_float() > 0,
+                counters[key] * 100.0 / Badge.criteria[key].as_float()
+            )
+            for key in PROGRESS_TYPES
+        ],
+        else_=0
+    )
+    return case((percentage > 100, 100), else_=percentage)
+
+
+def get_closest_badge(user_id, counters):
+    """
+    Find the unearned active badge the user is closest to earning
+
+    Progress percentages are computed in SQL from the pre-fetched counters
+    and each badge's JSON criteria, so only the top badge is returned
+
+    Returns:
+        (Badge, progress dict) or None
+    """
+    already_earned = exists().where(
+        UserBadge.badge_id == Badge.id,
+        UserBadge.user_id == user_id
+    )
+
+    badge = Badge.query.filter(
+        Badge.is_active == True,
+        ~already_earned
+    ).order_by(badge_percentage(counters).desc(), Badge.id.asc()).first()
+
+    if not badge:
+        return None
+
+    return badge, build_badge_progress(badge.criteria, counters)
+
+
+def calculate_badge_progress(user_id, badge_id):
+    """
+    Calculate user's progress toward a specific badge
+
+    Returns:
+        dict with current/required values and percentage
+    """
+    badge = Badge.query.get(badge_id)
+    if not badge:
+        return None
+
+    counters = get_badge_counters(user_id)
+    if counters is None:
+        return None
+
+    return build_badge_progress(badge.criteria, counters)
+
+
+def calculate_all_badge_progress(user_id, limit=None, offset=0):
+    """
+    Progress toward unearned active badges from one counters query
+
+    Sorted (and optionally paged) in SQL by completion percentage
+
+    Returns:
+        (total unearned, list of (Badge, progress dict)), closest to completion first
+    """
+    counters = get_badge_counters(user_id)
+    if counters is None:
+        return 0, []
+
+    already_earned = exists().where(
+        UserBadge.badge_id == Badge.id,
+        UserBadge.user_id == user_id
+    )
+    unearned = (Badge.is_active == True, ~already_earned)
+
+    rows = db.session.execute(
+        select(Badge, func.count().over().label("total"))
+        .where(*unearned)
+        .order_by(badge_percentage(counters).desc(), Badge.id.asc())
+        .limit(limit)
+        .offset(offset)
+    ).all()
+
+    if rows:
+        total = rows[0].total
+    elif offset:
+        # Paged past the end - the window count came back with no rows
+        total = db.session.execute(
+            select(func.count(Badge.id)).where(*unearned)
+        ).scalar()
+    else:
+        total = 0
+
+    return total, [
+        (badge, build_badge_progress(badge.criteria, counters))
+        for badge, _ in rows
+    ]
+
+
+BADGE_CATALOG_CACHE_TTL = 60  # seconds - awarded_count may lag by this much
+BADGE_CATALOG_VERSION_KEY = "badges:catalog_version"
+
+
+def bump_badge_catalog_version():
+    """Invalidate every cached catalog listing (call after badge definitions change)"""
+    version = datetime.datetime.utcnow().timestamp()
+    cache.set(BADGE_CATALOG_VERSION_KEY, version, timeout=0)  # No expiry
+    return version
+
+
+def get_badge_catalog(category="", rarity=""):
+    """
+    Active badges (optionally filtered) as plain dicts, cached briefly
+    since the catalog is the same for every user
+    """
+    version = cache.get(BADGE_CATALOG_VERSION_KEY) or bump_badge_catalog_version()
+    key = f"badges:available:{version}:{category}:{rarity}"
+
+    catalog = cache.get(key)
+    if catalog is not None:
+        return catalog
+
+    query = select(Badge).where(Badge.is_active == True)
+    if category:
+        query = query.where(Badge.category == category)
+    if rarity:
+        query = query.where(Badge.rarity == rarity)
+
+    badges = db.session.execute(
+        query.order_by(Badge.rarity.desc(), Badge.awarded_count.desc())
+    ).scalars()
+
+    catalog = [{
+        "id": badge.id,
+        "name": badge.name,
+        "description": badge.description,
+        "icon": badge.icon,
+        "category": badge.category,
+        "rarity": badge.rarity,
+        "awarded_count": badge.awarded_count
+    } for badge in badges]
+
+    cache.set(key, catalog, timeout=BADGE_CATALOG_CACHE_TTL)
+    return catalog
+
+
 # ============================================================================
 # BADGE ENDPOINTS
 # ============================================================================
@@ -474,64 +731,54 @@ def get_available_badges(current_user):
     Query params:
     - category: Filter by category
     - rarity: Filter by rarity
+    - page: Page number (default 1)
+    - per_page: Items per page (default 50, max 100)
     """
     try:
         category = request.args.get("category", "").strip()
         rarity = request.args.get("rarity", "").strip()
+        page = max(request.args.get("page", 1, type=int), 1)
+        per_page = min(max(request.args.get("per_page", 50, type=int), 1), 100)
         
-        query = Badge.query.filter_by(is_active=True)
-        
-        if category:
-            query = query.filter_by(category=category)
+        catalog = get_badge_catalog(category, rarity)
+        start = (page - 1) * per_page
         
-        if rarity:
-            query = query.filter_by(rarity=rarity)
+        # Only this page's badges need their earned_at looked up
+        page_badges = catalog[start:start + per_page]
         
-        badges = query.order_by(
-            Badge.rarity.desc(),
-            Badge.awarded_count.desc()
-        ).all()
+        earned_map = {}
+        if page_badges:
+            earned_map = dict(db.session.execute(
+                select(UserBadge.badge_id, UserBadge.earned_at).where(
+                    UserBadge.user_id == current_user.id,
+                    UserBadge.badge_id.in_([badge["id"] for badge in page_badges])
+                )
+            ).all())
         
-        # Check which badges user has earned
-        user_badge_ids = [ub.badge_id for ub in UserBadge.query.filter_by(user_id=current_user.id).all()]
+        earned_count = db.session.execute(
+            select(func.count()).select_from(UserBadge).where(UserBadge.user_id == current_user.id)
+        ).scalar()
         
         badges_data = []
-        for badge in badges:
-            has_earned = badge.id in user_badge_ids
+        for badge in page_badges:
+            has_earned = badge["id"] in earned_map
+            earned_at = earned_map.get(badge["id"])
             
             badges_data.append({
-                "id": badge.id,
-                "name": badge.name,
-                "description": badge.description,
-                "icon": badge.icon,
-                "category": badge.category,
-                "rarity": badge.rarity,
-                "awarded_count": badge.awarded_count,
+                **badge,
                 "has_earned": has_earned,
-                "earned_at": next(
-                    (ub.earned_at.isoformat() for ub in UserBadge.query.filter_by(
-                        user_id=current_user.id,
-                        badge_id=badge.id
-                    ).all()),
-                    None
-                ) if has_earned else None
+                "earned_at": earned_at.isoformat() if earned_at else None
             })
         
-        # Group by category
-        categories = {}
-        for badge in badges_data:
-            cat = badge["category"]
-            if cat not in categories:
-                categories[cat] = []
-            categories[cat].append(badge)
-        
         return jsonify({
             "status": "success",
             "data": {
                 "badges": badges_data,
-                "by_category": categories,
-                "total": len(badges_data),
-                "earned": len(user_badge_ids)
+                "total": len(catalog),
+                "earned": earned_count,
+                "page": page,
+                "per_page": per_page,
+                "pages": (len(catalog) + per_page - 1) // per_page
             }
         })
         
@@ -540,6 +787,36 @@ def get_available_badges(current_user):
         return error_response("Failed to load badges")
 
 
+@badges_bp.route("/badges/categories", methods=["GET"])
+@token_required
+def get_badge_categories(current_user):
+    """
+    Get badge categories with how many active badges each has
+    (fetch a category's badges via /badges/available?category=...)
+    """
+    try:
+        rows = db.session.execute(
+            select(Badge.category, func.count(Badge.id))
+            .where(Badge.is_active == True)
+            .group_by(Badge.category)
+            .order_by(Badge.category)
+        ).all()
+        
+        return jsonify({
+            "status": "success",
+            "data": {
+                "categories": [
+                    {"category": category, "count": count}
+                    for category, count in rows
+                ]
+            }
+        })
+        
+    except Exception as e:
+        current_app.logger.error(f"Get badge categories error: {str(e)}")
+        return error_response("Failed to load badge categories")
+
+
 @badges_bp.route("/badges/my-badges", methods=["GET"])
 @token_required
 def get_my_badges(current_user):
@@ -547,24 +824,24 @@ def get_my_badges(current_user):
     Get all badges earned by current user
     """
     try:
-        user_badges = UserBadge.query.filter_by(
-            user_id=current_user.id
-        ).order_by(UserBadge.earned_at.desc()).all()
+        # Earned rows joined to their badges - one query
+        rows = db.session.execute(
+            select(UserBadge, Badge)
+            .join(Badge, UserBadge.badge_id == Badge.id)
+            .where(UserBadge.user_id == current_user.id)
+            .order_by(UserBadge.earned_at.desc())
+        ).all()
         
-        badges_data = []
-        for ub in user_badges:
-            badge = Badge.query.get(ub.badge_id)
-            if badge:
-                badges_data.append({
-                    "id": badge.id,
-                    "name": badge.name,
-                    "description": badge.description,
-                    "icon": badge.icon,
-                    "category": badge.category,
-                    "rarity": badge.rarity,
-                    "earned_at": ub.earned_at.isoformat(),
-                    "is_featured": ub.is_featured
-                })
+        badges_data = [{
+            "id": badge.id,
+            "name": badge.name,
+            "description": badge.description,
+            "icon": badge.icon,
+            "category": badge.category,
+            "rarity": badge.rarity,
+            "earned_at": ub.earned_at.isoformat(),
+            "is_featured": ub.is_featured
+        } for ub, badge in rows]
         
         # Group by rarity
         by_rarity = {}
@@ -595,41 +872,39 @@ def get_badge_progress(current_user):
     """
     Get progress toward all unearned badges
     Shows how close user is to earning each badge
+    
+    Query params:
+    - page: Page number (default 1)
+    - per_page: Items per page (default 50, max 100)
     """
     try:
-        # Get all badges user hasn't earned yet
-        earned_badge_ids = [ub.badge_id for ub in UserBadge.query.filter_by(user_id=current_user.id).all()]
+        page = max(request.args.get("page", 1, type=int), 1)
+        per_page = min(max(request.args.get("per_page", 50, type=int), 1), 100)
         
-        unearned_badges = Badge.query.filter(
-            Badge.is_active == True,
-            Badge.id.notin_(earned_badge_ids)
-        ).all()
+        total, page_progress = calculate_all_badge_progress(
+            current_user.id, limit=per_page, offset=(page - 1) * per_page
+        )
         
-        progress_data = []
-        for badge in unearned_badges:
-            progress = calculate_badge_progress(current_user.id, badge.id)
-            
-            if progress:
-                progress_data.append({
-                    "badge": {
-                        "id": badge.id,
-                        "name": badge.name,
-                        "description": badge.description,
-                        "icon": badge.icon,
-                        "category": badge.category,
-                        "rarity": badge.rarity
-                    },
-                    "progress": progress
-                })
-        
-        # Sort by percentage (closest to completion first)
-        progress_data.sort(key=lambda x: x["progress"]["percentage"], reverse=True)
+        progress_data = [{
+            "badge": {
+                "id": badge.id,
+                "name": badge.name,
+                "description": badge.description,
+                "icon": badge.icon,
+                "category": badge.category,
+                "rarity": badge.rarity
+            },
+            "progress": progress
+        } for badge, progress in page_progress]
         
         return jsonify({
             "status": "success",
             "data": {
                 "progress": progress_data,
-                "total_unearned": len(progress_data)
+                "total_unearned": total,
+                "page": page,
+                "per_page": per_page,
+                "pages": (total + per_page - 1) // per_page
             }
         })
         
@@ -665,20 +940,20 @@ def get_badge_details(current_user, badge_id):
             progress = calculate_badge_progress(current_user.id, badge_id)
         
         # Get recent earners (last 10)
-        recent_earners = UserBadge.query.filter_by(
-            badge_id=badge_id
-        ).order_by(UserBadge.earned_at.desc()).limit(10).all()
-        
-        earners_data = []
-        for ub in recent_earners:
-            user = User.query.get(ub.user_id)
-            if user:
-                earners_data.append({
-                    "username": user.username,
-                    "name": user.name,
-                    "avatar": user.avatar,
-                    "earned_at": ub.earned_at.isoformat()
-                })
+        recent_earners = db.session.execute(
+            select(User.username, User.name, User.avatar, UserBadge.earned_at)
+            .join(User, User.id == UserBadge.user_id)
+            .where(UserBadge.badge_id == badge_id)
+            .order_by(UserBadge.earned_at.desc())
+            .limit(10)
+        ).all()
+        
+        earners_data = [{
+            "username": earner.username,
+            "name": earner.name,
+            "avatar": earner.avatar,
+            "earned_at": earner.earned_at.isoformat()
+        } for earner in recent_earners]
         
         return jsonify({
             "status": "success",
@@ -710,7 +985,7 @@ def get_badge_details(current_user, badge_id):
 def feature_badge(current_user, badge_id):
     """
     Feature a badge on profile (show prominently)
-    Max 3 featured badges per user
+    Max MAX_FEATURED_BADGES featured badges per user
     """
     try:
         user_badge = UserBadge.query.filter_by(
@@ -721,14 +996,20 @@ def feature_badge(current_user, badge_id):
         if not user_badge:
             return error_response("You haven't earned this badge", 404)
         
-        # Check current featured count
-        featured_count = UserBadge.query.filter_by(
-            user_id=current_user.id,
-            is_featured=True
-        ).count()
-        
-        if featured_count >= 3 and not user_badge.is_featured:
-            return error_response("Maximum 3 featured badges allowed", 400)
+        # Limit only applies when featuring - count stops at the limit
+        if not user_badge.is_featured:
+            featured = (
+                select(UserBadge.id)
+                .where(UserBadge.user_id == current_user.id, UserBadge.is_featured == True)
+                .limit(MAX_FEATURED_BADGES)
+                .subquery()
+            )
+            featured_count = db.session.execute(
+                select(func.count()).select_from(featured)
+            ).scalar()
+            
+            if featured_count >= MAX_FEATURED_BADGES:
+                return error_response(f"Maximum {MAX_FEATURED_BADGES} featured badges allowed", 400)
         
         # Toggle featured status
         user_badge.is_featured = not user_badge.is_featured
@@ -4,25 +4,184 @@ Users must connect before messaging - prevents spam and creates safer community
 """
 
 from flask import Blueprint, request, jsonify, current_app
-from sqlalchemy import or_, and_, func
+from sqlalchemy import or_, and_, case, func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import contains_eager, selectinload
+from concurrent.futures import ThreadPoolExecutor
 import datetime
 
 from models import (
     User, StudentProfile, Connection, Notification,
     Post, Comment, Thread, ThreadMember
 )
-from extensions import db
+from extensions import db, cache
 from routes.student.helpers import (
-    token_required, success_response, error_response
+    token_required, success_response, error_response, raiseload_guard
 )
 
 connections_bp = Blueprint("student_connections", __name__)
 
+CONNECTION_STATUS_CACHE_TTL = 30  # seconds
+SUGGESTIONS_CACHE_TTL = 300  # seconds
+
+
+# ============================================================================
+# NOTIFICATIONS
+# ============================================================================
+
+_notification_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="notify")
+
+
+def _insert_notification(app, fields):
+    """Write one Notification in its own app context (and DB session)"""
+    with app.app_context():
+        try:
+            db.session.add(Notification(**fields))
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            app.logger.error(f"Notification insert error: {str(e)}")
+
+
+def queue_notification(**fields):
+    """
+    Create a Notification off the request path - call after the action's
+    commit so nothing is sent for a rolled-back action.
+    SQLite serializes writers, so there it runs inline
+    """
+    app = current_app._get_current_object()
+    if db.engine.dialect.name == "sqlite":
+        _insert_notification(app, fields)
+    else:
+        _notification_executor.submit(_insert_notification, app, fields)
+
+
+# ============================================================================
+# CONNECTION STATUS CACHE
+# ============================================================================
+
+def connection_cache_key(user_a, user_b):
+    """Cache key for the connection between two users (order-independent)"""
+    return f"conn:{min(user_a, user_b)}:{max(user_a, user_b)}"
+
+
+def suggestions_cache_key(user_id):
+    return f"suggestions:{user_id}"
+
+
+def invalidate_connection_status(user_a, user_b):
+    """
+    Drop the cached connection between two users after it changes, along
+    with both users' suggestions (which exclude existing connections)
+    """
+    cache.delete_many(
+        connection_cache_key(user_a, user_b),
+        suggestions_cache_key(user_a),
+        suggestions_cache_key(user_b)
+    )
+
+
+def get_pair_connection(user_a, user_b):
+    """
+    Connection row between two users as a plain dict, or None.
+
+    Profile pages check this on every view, so the result (including the
+    "no connection" case) is cached for CONNECTION_STATUS_CACHE_TTL seconds
+    and dropped by invalidate_connection_status whenever the pair changes.
+    """
+    key = connection_cache_key(user_a, user_b)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached.get("connection")
+
+    # Just the cached columns - no Connection entity is built
+    connection = db.session.execute(
+        select(
+            Connection.id,
+            Connection.status,
+            Connection.requester_id,
+            Connection.responded_at
+        ).where(
+            or_(
+                and_(Connection.requester_id == user_a, Connection.receiver_id == user_b),
+                and_(Connection.requester_id == user_b, Connection.receiver_id == user_a)
+            )
+        )
+    ).first()
+
+    pair = None
+    if connection:
+        pair = {
+            "id": connection.id,
+            "status": connection.status,
+            "requester_id": connection.requester_id,
+            "responded_at": connection.responded_at.isoformat() if connection.responded_at else None
+        }
+
+    cache.set(key, {"connection": pair}, timeout=CONNECTION_STATUS_CACHE_TTL)
+    return pair
+
 
 # ============================================================================
 # CONNECTION REQUESTS
 # ============================================================================
 
+def insert_connection_request(requester_id, receiver_id, notes=None):
+    """
+    Insert a pending request unless the pair already has a connection row.
+
+    Returns the new connection id, or None when a row exists in either
+    direction. ix_connections_pair makes this a single atomic statement,
+    so two simultaneous taps can't both create a request.
+    """
+    table = Connection.__table__
+    values = {
+        "requester_id": requester_id,
+        "receiver_id": receiver_id,
+        "status": "pending",
+        "notes": notes,
+        "requested_at": datetime.datetime.utcnow(),
+        "connection_type": "connection"
+    }
+
+    dialect = db.session.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        insert = None
+
+    if insert is None:
+        # No native upsert - let the unique index reject the duplicate
+        try:
+            with db.session.begin_nested():
+                connection = Connection(**values)
+                db.session.add(connection)
+            return connection.id
+        except IntegrityError:
+            return None
+
+    stmt = insert(table).values(**values).on_conflict_do_nothing().returning(table.c.id)
+    return db.session.execute(stmt).scalar_one_or_none()
+
+
+def get_request_for_update(request_id):
+    """
+    Connection row locked until commit (SELECT ... FOR UPDATE), so two
+    concurrent accept/reject/cancel taps can't both see it as pending.
+
+    Stays on the ORM path rather than a conditional bulk UPDATE so the
+    total_connections counter hooks still fire
+    """
+    return db.session.execute(
+        select(Connection)
+        .where(Connection.id == request_id)
+        .with_for_update()
+        .execution_options(populate_existing=True)
+    ).scalar_one_or_none()
+
+
 @connections_bp.route("/connections/request/<int:user_id>", methods=["POST"])
 @token_required
 def send_connection_request(current_user, user_id):
@@ -42,16 +201,26 @@ def send_connection_request(current_user, user_id):
         if not target_user:
             return error_response("User not found", 404)
         
-        # Check if connection already exists (either direction)
-        existing = Connection.query.filter(
-            or_(
-                and_(Connection.requester_id == current_user.id, Connection.receiver_id == user_id),
-                and_(Connection.requester_id == user_id, Connection.receiver_id == current_user.id)
-            )
-        ).first()
+        data = request.get_json(silent=True) or {}
+        message = data.get("message", "").strip()
         
-        if existing:
-            if existing.status == "accepted":
+        # Create new connection request - no-op if the pair already has a row
+        connection_id = insert_connection_request(
+            current_user.id, user_id, notes=message if message else None
+        )
+        
+        if connection_id is None:
+            existing = Connection.query.filter(
+                or_(
+                    and_(Connection.requester_id == current_user.id, Connection.receiver_id == user_id),
+                    and_(Connection.requester_id == user_id, Connection.receiver_id == current_user.id)
+                )
+            ).first()
+            
+            if not existing:
+                # Row vanished between the insert and this lookup
+                return error_response("Please try again", 409)
+            elif existing.status == "accepted":
                 return error_response("Already connected", 409)
             elif existing.status == "pending":
                 return error_response("Connection request already pending", 409)
@@ -63,9 +232,9 @@ def send_connection_request(current_user, user_id):
                 existing.requested_at = datetime.datetime.utcnow()
                 existing.responded_at = None
                 db.session.commit()
+                invalidate_connection_status(current_user.id, user_id)
                 
-                # Create notification
-                notification = Notification(
+                queue_notification(
                     user_id=user_id,
                     title="New Connection Request",
                     body=f"{current_user.name} sent you a connection request again",
@@ -73,28 +242,18 @@ def send_connection_request(current_user, user_id):
                     related_type="user",
                     related_id=current_user.id
                 )
-                db.session.add(notification)
-                db.session.commit()
                 
                 return success_response(
                     "Connection request re-sent",
                     data={"connection_id": existing.id}
                 ), 201
+            else:
+                return error_response("Connection already exists", 409)
         
-        # Create new connection request
-        data = request.get_json(silent=True) or {}
-        message = data.get("message", "").strip()
-        
-        connection = Connection(
-            requester_id=current_user.id,
-            receiver_id=user_id,
-            status="pending",
-            notes=message if message else None
-        )
-        db.session.add(connection)
+        db.session.commit()
+        invalidate_connection_status(current_user.id, user_id)
         
-        # Create notification
-        notification = Notification(
+        queue_notification(
             user_id=user_id,
             title="New Connection Request",
             body=f"{current_user.name} wants to connect with you",
@@ -102,14 +261,11 @@ def send_connection_request(current_user, user_id):
             related_type="user",
             related_id=current_user.id
         )
-        db.session.add(notification)
-        
-        db.session.commit()
         
         return success_response(
             "Connection request sent",
             data={
-                "connection_id": connection.id,
+                "connection_id": connection_id,
                 "receiver": {
                     "id": target_user.id,
                     "name": target_user.name,
@@ -131,7 +287,7 @@ def accept_connection(current_user, request_id):
     Accept a connection request
     """
     try:
-        connection = Connection.query.get(request_id)
+        connection = get_request_for_update(request_id)
         
         if not connection:
             return error_response("Connection request not found", 404)
@@ -147,8 +303,11 @@ def accept_connection(current_user, request_id):
         connection.status = "accepted"
         connection.responded_at = datetime.datetime.utcnow()
         
-        # Create notification for requester
-        notification = Notification(
+        db.session.commit()
+        invalidate_connection_status(connection.requester_id, connection.receiver_id)
+        
+        # Notify the requester
+        queue_notification(
             user_id=connection.requester_id,
             title="Connection Accepted",
             body=f"{current_user.name} accepted your connection request",
@@ -156,9 +315,6 @@ def accept_connection(current_user, request_id):
             related_type="user",
             related_id=current_user.id
         )
-        db.session.add(notification)
-        
-        db.session.commit()
         
         # Get requester info
         requester = User.query.get(connection.requester_id)
@@ -189,7 +345,7 @@ def reject_connection(current_user, request_id):
     Reject a connection request
     """
     try:
-        connection = Connection.query.get(request_id)
+        connection = get_request_for_update(request_id)
         
         if not connection:
             return error_response("Connection request not found", 404)
@@ -206,6 +362,7 @@ def reject_connection(current_user, request_id):
         connection.responded_at = datetime.datetime.utcnow()
         
         db.session.commit()
+        invalidate_connection_status(connection.requester_id, connection.receiver_id)
         
         return success_response("Connection request rejected")
         
@@ -222,7 +379,7 @@ def cancel_connection_request(current_user, request_id):
     Cancel a pending connection request you sent
     """
     try:
-        connection = Connection.query.get(request_id)
+        connection = get_request_for_update(request_id)
         
         if not connection:
             return error_response("Connection request not found", 404)
@@ -237,6 +394,7 @@ def cancel_connection_request(current_user, request_id):
         # Delete the request
         db.session.delete(connection)
         db.session.commit()
+        invalidate_connection_status(connection.requester_id, connection.receiver_id)
         
         return success_response("Connection request cancelled")
         
@@ -268,6 +426,7 @@ def remove_connection(current_user, user_id):
         # Delete the connection
         db.session.delete(connection)
         db.session.commit()
+        invalidate_connection_status(current_user.id, user_id)
         
         return success_response("Connection removed")
         
@@ -281,6 +440,22 @@ def remove_connection(current_user, user_id):
 # VIEW CONNECTIONS
 # ============================================================================
 
+def connected_user_ids(user_id):
+    """SELECT of the other side of every accepted connection of user_id (either direction)"""
+    return select(
+        case(
+            (Connection.requester_id == user_id, Connection.receiver_id),
+            else_=Connection.requester_id
+        ).label("other_id")
+    ).where(
+        or_(
+            Connection.requester_id == user_id,
+            Connection.receiver_id == user_id
+        ),
+        Connection.status == "accepted"
+    )
+
+
 @connections_bp.route("/connections/list", methods=["GET"])
 @token_required
 def list_connections(current_user):
@@ -294,25 +469,12 @@ def list_connections(current_user):
     - per_page: Items per page (default 20)
     """
     try:
-        # Get all accepted connections (both directions)
-        connections = Connection.query.filter(
-            or_(
-                Connection.requester_id == current_user.id,
-                Connection.receiver_id == current_user.id
-            ),
-            Connection.status == "accepted"
-        ).all()
-        
-        # Extract connected user IDs
-        connected_user_ids = []
-        for conn in connections:
-            if conn.requester_id == current_user.id:
-                connected_user_ids.append(conn.receiver_id)
-            else:
-                connected_user_ids.append(conn.requester_id)
-        
-        # Get user details
-        query = User.query.filter(User.id.in_(connected_user_ids))
+        # Get user details with their profile in the same query
+        query = User.query.outerjoin(
+            StudentProfile, StudentProfile.user_id == User.id
+        ).options(
+            contains_eager(User.student_profile)
+        ).filter(User.id.in_(connected_user_ids(current_user.id)))
         
         # Search filter
         search = request.args.get("search", "").strip()
@@ -327,9 +489,7 @@ def list_connections(current_user):
         # Department filter
         department = request.args.get("department", "").strip()
         if department:
-            query = query.join(StudentProfile).filter(
-                StudentProfile.department == department
-            )
+            query = query.filter(StudentProfile.department == department)
         
         # Pagination
         page = request.args.get("page", 1, type=int)
@@ -340,7 +500,7 @@ def list_connections(current_user):
         # Format response
         connections_data = []
         for user in paginated.items:
-            profile = StudentProfile.query.filter_by(user_id=user.id).first()
+            profile = user.student_profile
             connections_data.append({
                 "id": user.id,
                 "username": user.username,
@@ -381,53 +541,55 @@ def pending_requests(current_user):
     """
     try:
         # Requests you sent
-        sent_requests = Connection.query.filter_by(
-            requester_id=current_user.id,
-            status="pending"
+        sent_rows = db.session.query(Connection, User, StudentProfile).join(
+            User, User.id == Connection.receiver_id
+        ).outerjoin(
+            StudentProfile, StudentProfile.user_id == User.id
+        ).filter(
+            Connection.requester_id == current_user.id,
+            Connection.status == "pending"
         ).all()
         
         sent_data = []
-        for req in sent_requests:
-            receiver = User.query.get(req.receiver_id)
-            if receiver:
-                profile = StudentProfile.query.filter_by(user_id=receiver.id).first()
-                sent_data.append({
-                    "request_id": req.id,
-                    "user": {
-                        "id": receiver.id,
-                        "username": receiver.username,
-                        "name": receiver.name,
-                        "avatar": receiver.avatar,
-                        "department": profile.department if profile else None
-                    },
-                    "requested_at": req.requested_at.isoformat(),
-                    "message": req.notes
-                })
+        for req, receiver, profile in sent_rows:
+            sent_data.append({
+                "request_id": req.id,
+                "user": {
+                    "id": receiver.id,
+                    "username": receiver.username,
+                    "name": receiver.name,
+                    "avatar": receiver.avatar,
+                    "department": profile.department if profile else None
+                },
+                "requested_at": req.requested_at.isoformat(),
+                "message": req.notes
+            })
         
         # Requests you received
-        received_requests = Connection.query.filter_by(
-            receiver_id=current_user.id,
-            status="pending"
+        received_rows = db.session.query(Connection, User, StudentProfile).join(
+            User, User.id == Connection.requester_id
+        ).outerjoin(
+            StudentProfile, StudentProfile.user_id == User.id
+        ).filter(
+            Connection.receiver_id == current_user.id,
+            Connection.status == "pending"
         ).all()
         
         received_data = []
-        for req in received_requests:
-            requester = User.query.get(req.requester_id)
-            if requester:
-                profile = StudentProfile.query.filter_by(user_id=requester.id).first()
-                received_data.append({
-                    "request_id": req.id,
-                    "user": {
-                        "id": requester.id,
-                        "username": requester.username,
-                        "name": requester.name,
-                        "avatar": requester.avatar,
-                        "department": profile.department if profile else None,
-                        "bio": requester.bio
-                    },
-                    "requested_at": req.requested_at.isoformat(),
-                    "message": req.notes
-                })
+        for req, requester, profile in received_rows:
+            received_data.append({
+                "request_id": req.id,
+                "user": {
+                    "id": requester.id,
+                    "username": requester.username,
+                    "name": requester.name,
+                    "avatar": requester.avatar,
+                    "department": profile.department if profile else None,
+                    "bio": requester.bio
+                },
+                "requested_at": req.requested_at.isoformat(),
+                "message": req.notes
+            })
         
         return jsonify({
             "status": "success",
@@ -464,12 +626,7 @@ def connection_status(current_user, user_id):
             })
         
         # Check for connection
-        connection = Connection.query.filter(
-            or_(
-                and_(Connection.requester_id == current_user.id, Connection.receiver_id == user_id),
-                and_(Connection.requester_id == user_id, Connection.receiver_id == current_user.id)
-            )
-        ).first()
+        connection = get_pair_connection(current_user.id, user_id)
         
         if not connection:
             return jsonify({
@@ -482,16 +639,16 @@ def connection_status(current_user, user_id):
             })
         
         # Determine status
-        if connection.status == "accepted":
+        if connection["status"] == "accepted":
             conn_status = "connected"
             can_message = True
-        elif connection.status == "pending":
-            if connection.requester_id == current_user.id:
+        elif connection["status"] == "pending":
+            if connection["requester_id"] == current_user.id:
                 conn_status = "pending_sent"
             else:
                 conn_status = "pending_received"
             can_message = False
-        elif connection.status == "blocked":
+        elif connection["status"] == "blocked":
             conn_status = "blocked"
             can_message = False
         else:
@@ -504,8 +661,8 @@ def connection_status(current_user, user_id):
                 "status": conn_status,
                 "can_message": can_message,
                 "can_connect": conn_status in ["none", "rejected"],
-                "connection_id": connection.id if connection else None,
-                "connected_at": connection.responded_at.isoformat() if connection and connection.status == "accepted" else None
+                "connection_id": connection["id"],
+                "connected_at": connection["responded_at"] if connection["status"] == "accepted" else None
             }
         })
         
@@ -529,8 +686,15 @@ def connection_suggestions(current_user):
     - Mutual connections
     
     Limit: 10 suggestions
+    Cached per user for SUGGESTIONS_CACHE_TTL seconds; connection changes
+    drop the entry early (invalidate_connection_status)
     """
     try:
+        key = suggestions_cache_key(current_user.id)
+        data = cache.get(key)
+        if data is not None:
+            return jsonify({"status": "success", "data": data})
+        
         profile = StudentProfile.query.filter_by(user_id=current_user.id).first()
         
         # Get existing connections and pending requests
@@ -541,36 +705,43 @@ def connection_suggestions(current_user):
             )
         ).all()
         
-        excluded_ids = [current_user.id]
+        excluded_ids = {current_user.id}
         for conn in existing_connections:
             if conn.requester_id == current_user.id:
-                excluded_ids.append(conn.receiver_id)
+                excluded_ids.add(conn.receiver_id)
             else:
-                excluded_ids.append(conn.requester_id)
+                excluded_ids.add(conn.requester_id)
+        
+        # Lower-cased once instead of per candidate
+        my_skills = {s.lower() for s in (current_user.skills or [])}
+        my_goals = {g.lower() for g in (current_user.learning_goals or [])}
         
         suggestions = []
+        seen_ids = set()
         
         # 1. Same department students
-        same_dept_users = User.query.join(StudentProfile).filter(
+        same_dept_users = User.query.join(StudentProfile).options(
+            contains_eager(User.student_profile), *raiseload_guard()
+        ).filter(
             StudentProfile.department == profile.department,
             User.id.notin_(excluded_ids),
             User.status == "approved"
         ).limit(5).all()
         
         for user in same_dept_users:
-            user_profile = StudentProfile.query.filter_by(user_id=user.id).first()
+            user_profile = user.student_profile
             
             # Calculate match score
             score = 50  # Base score for same department
             
             # Skill overlap
-            if user.skills and current_user.skills:
-                common_skills = set(s.lower() for s in user.skills) & set(s.lower() for s in current_user.skills)
+            if user.skills and my_skills:
+                common_skills = my_skills.intersection(s.lower() for s in user.skills)
                 score += len(common_skills) * 10
             
             # Learning goal overlap
-            if user.learning_goals and current_user.learning_goals:
-                common_goals = set(g.lower() for g in user.learning_goals) & set(g.lower() for g in current_user.learning_goals)
+            if user.learning_goals and my_goals:
+                common_goals = my_goals.intersection(g.lower() for g in user.learning_goals)
                 score += len(common_goals) * 15
             
             suggestions.append({
@@ -588,6 +759,7 @@ def connection_suggestions(current_user):
                 "match_score": min(score, 100),
                 "reason": "Same department"
             })
+            seen_ids.add(user.id)
         
         # 2. Users in similar threads
         user_threads = ThreadMember.query.filter_by(student_id=current_user.id).all()
@@ -599,10 +771,25 @@ def connection_suggestions(current_user):
                 ThreadMember.student_id.notin_(excluded_ids)
             ).limit(5).all()
             
+            # Members not already suggested, with their profiles, in one
+            # round trip each
+            member_ids = {tm.student_id for tm in thread_members} - seen_ids
+            members = {
+                user.id: user
+                for user in User.query.options(
+                    selectinload(User.student_profile), *raiseload_guard()
+                ).filter(
+                    User.id.in_(member_ids),
+                    User.status == "approved"
+                )
+            } if member_ids else {}
+            
             for tm in thread_members:
-                user = User.query.get(tm.student_id)
-                if user and user.id not in [s["user"]["id"] for s in suggestions]:
-                    user_profile = StudentProfile.query.filter_by(user_id=user.id).first()
+                if tm.student_id in seen_ids:
+                    continue
+                user = members.get(tm.student_id)
+                if user:
+                    user_profile = user.student_profile
                     suggestions.append({
                         "user": {
                             "id": user.id,
@@ -617,17 +804,18 @@ def connection_suggestions(current_user):
                         "match_score": 70,
                         "reason": "Active in similar threads"
                     })
+                    seen_ids.add(user.id)
         
         # Sort by match score
         suggestions.sort(key=lambda x: x["match_score"], reverse=True)
         
-        return jsonify({
-            "status": "success",
-            "data": {
-                "suggestions": suggestions[:10],  # Top 10
-                "total": len(suggestions)
-            }
-        })
+        data = {
+            "suggestions": suggestions[:10],  # Top 10
+            "total": len(suggestions)
+        }
+        cache.set(key, data, timeout=SUGGESTIONS_CACHE_TTL)
+        
+        return jsonify({"status": "success", "data": data})
         
     except Exception as e:
         current_app.logger.error(f"Connection suggestions error: {str(e)}")
@@ -646,42 +834,17 @@ def mutual_connections(current_user, user_id):
     Find mutual connections between you and another user
     """
     try:
-        # Get your connections
-        your_connections = Connection.query.filter(
-            or_(
-                Connection.requester_id == current_user.id,
-                Connection.receiver_id == current_user.id
-            ),
-            Connection.status == "accepted"
-        ).all()
-        
-        your_connection_ids = set()
-        for conn in your_connections:
-            if conn.requester_id == current_user.id:
-                your_connection_ids.add(conn.receiver_id)
-            else:
-                your_connection_ids.add(conn.requester_id)
+        # Mutual ids computed in the database - only the count and the
+        # first page of users come back
+        mutual_ids = connected_user_ids(current_user.id).intersect(
+            connected_user_ids(user_id)
+        ).subquery()
         
-        # Get their connections
-        their_connections = Connection.query.filter(
-            or_(
-                Connection.requester_id == user_id,
-                Connection.receiver_id == user_id
-            ),
-            Connection.status == "accepted"
-        ).all()
+        mutual_count = db.session.execute(
+            select(func.count()).select_from(mutual_ids)
+        ).scalar()
         
-        their_connection_ids = set()
-        for conn in their_connections:
-            if conn.requester_id == user_id:
-                their_connection_ids.add(conn.receiver_id)
-            else:
-                their_connection_ids.add(conn.requester_id)
-        
-        # Find mutual
-        mutual_ids = your_connection_ids & their_connection_ids
-        
-        if not mutual_ids:
+        if not mutual_count:
             return jsonify({
                 "status": "success",
                 "data": {
@@ -691,11 +854,13 @@ def mutual_connections(current_user, user_id):
             })
         
         # Get user details
-        mutual_users = User.query.filter(User.id.in_(mutual_ids)).limit(10).all()
+        mutual_users = User.query.options(
+            selectinload(User.student_profile), *raiseload_guard()
+        ).filter(User.id.in_(select(mutual_ids.c.other_id))).limit(10).all()
         
         mutual_data = []
         for user in mutual_users:
-            profile = StudentProfile.query.filter_by(user_id=user.id).first()
+            profile = user.student_profile
             mutual_data.append({
                 "id": user.id,
                 "username": user.username,
@@ -708,7 +873,7 @@ def mutual_connections(current_user, user_id):
             "status": "success",
             "data": {
                 "mutual_connections": mutual_data,
-                "count": len(mutual_ids),
+                "count": mutual_count,
                 "showing": len(mutual_data)
             }
         })
@@ -762,6 +927,7 @@ def block_user(current_user, user_id):
             db.session.add(block)
         
         db.session.commit()
+        invalidate_connection_status(current_user.id, user_id)
         
         return success_response(
             "User blocked successfully",
@@ -806,6 +972,7 @@ def unblock_user(current_user, user_id):
         # Remove block
         db.session.delete(block)
         db.session.commit()
+        invalidate_connection_status(current_user.id, user_id)
         
         return success_response("User unblocked successfully")
         
@@ -823,24 +990,27 @@ def list_blocked_users(current_user):
     """
     try:
         # Find all users blocked by current user    
-        blocked = Connection.query.filter(
+        blocked = db.session.query(Connection, User, StudentProfile).join(
+            User, User.id == Connection.requester_id
+        ).outerjoin(
+            StudentProfile, StudentProfile.user_id == User.id
+        ).options(
+            *raiseload_guard()
+        ).filter(
             Connection.receiver_id == current_user.id,
             Connection.status == "blocked"
         ).all()
         
         blocked_data = []
-        for block in blocked:
-            user = User.query.get(block.requester_id)
-            if user:
-                profile = StudentProfile.query.filter_by(user_id=user.id).first()
-                blocked_data.append({
-                    "id": user.id,
-                    "username": user.username,
-                    "name": user.name,
-                    "avatar": user.avatar,
-                    "department": profile.department if profile else None,
-                    "blocked_at": block.responded_at.isoformat() if block.responded_at else None
-                })
+        for block, user, profile in blocked:
+            blocked_data.append({
+                "id": user.id,
+                "username": user.username,
+                "name": user.name,
+                "avatar": user.avatar,
+                "department": profile.department if profile else None,
+                "blocked_at": block.responded_at.isoformat() if block.responded_at else None
+            })
         
         return jsonify({
             "status": "success",
@@ -1,6 +1,35 @@
 from flask_sqlalchemy import SQLAlchemy
-from flask_login import LoginManager
 from flask_mail import Mail
+from flask_caching import Cache
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # Optional - jsonify() falls back to the stdlib encoder
+    orjson = None
+
 db = SQLAlchemy()
-login_manager = LoginManager()
-mail = Mail()
\ No newline at end of file
+mail = Mail()
+cache = Cache()
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    jsonify() responses encoded with orjson; dumps()/loads() stay on the
+    stdlib provider (sessions, tokens). Dates and other non-native types
+    still go through Flask's default() so output matches the default provider
+    """
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            option |= orjson.OPT_INDENT_2
+
+        return self._app.response_class(
+            orjson.dumps(obj, default=self.default, option=option) + b"\n",
+            mimetype=self.mimetype
+        )
@@ -1,17 +1,22 @@
 # routes/student/helpers.py
 # Shared helper functions used across student routes
 
-from flask import request, jsonify, current_app
+from flask import request, jsonify, current_app, abort, make_response
+from flask_caching.backends import NullCache, SimpleCache
 from werkzeug.utils import secure_filename
 from functools import wraps
-from flask_login import current_user
 import jwt
 import datetime
 import os
 import secrets
+import threading
+import time
+from collections import OrderedDict
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import raiseload
 
 from models import User
-from extensions import db
+from extensions import db, cache
 
 # File upload settings
 ALLOWED_IMAGE_EXT = {"png", "jpg", "jpeg"}
@@ -52,15 +57,155 @@ def decode_token(token):
     return jwt.decode(token, secret, algorithms=["HS256"])
 
 
+# Access tokens already verified by this process -> (claims, recheck_at).
+# token_required only re-checks exp for these instead of the signature
+VERIFIED_TOKEN_CACHE_SIZE = 50_000
+VERIFIED_TOKEN_TTL = 60  # seconds before the signature is verified again
+
+_verified_tokens = OrderedDict()
+_verified_tokens_lock = threading.Lock()
+
+
+def decode_access_token(token):
+    """decode_token() backed by a small per-process LRU of verified claims"""
+    now = time.time()
+
+    with _verified_tokens_lock:
+        entry = _verified_tokens.get(token)
+        if entry:
+            _verified_tokens.move_to_end(token)
+
+    if entry:
+        payload, recheck_at = entry
+        if now < recheck_at:
+            if now >= payload.get("exp", now + 1):
+                forget_token(token)
+                raise jwt.ExpiredSignatureError("Signature has expired")
+            return payload
+
+    payload = decode_token(token)
+
+    with _verified_tokens_lock:
+        _verified_tokens[token] = (payload, now + VERIFIED_TOKEN_TTL)
+        _verified_tokens.move_to_end(token)
+        while len(_verified_tokens) > VERIFIED_TOKEN_CACHE_SIZE:
+            _verified_tokens.popitem(last=False)
+
+    return payload
+
+
+def forget_token(token):
+    """Drop a token from the verified cache (e.g. on logout)"""
+    with _verified_tokens_lock:
+        _verified_tokens.pop(token, None)
+
+
+# user_id -> role, so token_required can authorize without loading the user.
+# Only used with a cache shared by all workers: the invalidation hooks below
+# run in the worker that made the change, so a per-process cache would keep
+# authorizing a demoted user elsewhere until the entry expires
+AUTH_USER_CACHE_TTL = 30 * 60  # seconds - matches the access token lifetime
+
+
+def auth_user_cache_key(user_id):
+    return f"authuser:{user_id}"
+
+
+def auth_cache_is_shared():
+    return not isinstance(cache.cache, (SimpleCache, NullCache))
+
+
+@event.listens_for(User, "after_update")
+def _forget_changed_role(mapper, connection, target):
+    if inspect(target).attrs.role.history.has_changes():
+        cache.delete(auth_user_cache_key(target.id))
+
+
+@event.listens_for(User, "after_delete")
+def _forget_deleted_user(mapper, connection, target):
+    cache.delete(auth_user_cache_key(target.id))
+
+
+class AuthUser:
+    """
+    current_user handed out by token_required on an auth cache hit.
+    id and role are known up front; the User row is loaded on first access
+    to anything else (reads and writes go to it), so handlers that only
+    need current_user.id never query it
+    """
+
+    def __init__(self, user_id, role):
+        object.__setattr__(self, "id", user_id)
+        object.__setattr__(self, "role", role)
+        object.__setattr__(self, "_user", None)
+
+    def _load(self):
+        if self._user is None:
+            user = db.session.get(User, self.id)
+            if user is None:
+                # Deleted since the role was cached
+                cache.delete(auth_user_cache_key(self.id))
+                abort(make_response(
+                    jsonify({"status": "error", "message": "User not found."}), 401
+                ))
+            object.__setattr__(self, "_user", user)
+        return self._user
+
+    def __getattr__(self, name):
+        return getattr(self._load(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self._load(), name, value)
+
+
+def load_auth_user(user_id):
+    """
+    (current_user, role) for token_required, or (None, None) if the user
+    doesn't exist. With a shared cache, known users come back as an
+    AuthUser without a query
+    """
+    if user_id is None:
+        return None, None
+
+    shared = auth_cache_is_shared()
+    key = auth_user_cache_key(user_id)
+    if shared:
+        role = cache.get(key)
+        if role is not None:
+            return AuthUser(user_id, role), role
+
+    user = db.session.get(User, user_id)
+    if not user:
+        return None, None
+
+    if shared:
+        cache.set(key, user.role, timeout=AUTH_USER_CACHE_TTL)
+    return user, user.role
+
+
+def cookie_user():
+    """
+    The user behind the access_token cookie, or None - for server-rendered
+    templates, which have no token_required wrapper to resolve it
+    """
+    token = request.cookies.get("access_token")
+    if not token:
+        return None
+
+    try:
+        payload = decode_access_token(token)
+    except jwt.InvalidTokenError:
+        return None
+
+    user_id = payload.get("user_id")
+    return db.session.get(User, user_id) if user_id is not None else None
+
+
 def token_required(f):
     """JWT authentication decorator"""
     @wraps(f)
     def decorated(*args, **kwargs):
-        # Try session-based authentication first
-        if current_user and getattr(current_user, "is_authenticated", False):
-            return f(current_user, *args, **kwargs)
-
-        # Try token-based authentication
+        # Token-based authentication (header, then cookie)
         auth_header = request.headers.get("Authorization")
         token = None
         
@@ -77,13 +222,13 @@ def token_required(f):
             }), 401
 
         try:
-            payload = decode_token(token)
-            user = User.query.get(payload.get("user_id"))
+            payload = decode_access_token(token)
+            user, role = load_auth_user(payload.get("user_id"))
             
             if not user:
                 return jsonify({"status": "error", "message": "User not found."}), 401
                 
-            if user.role != "student":
+            if role != "student":
                 return jsonify({"status": "error", "message": "Access denied. Students only."}), 403
                 
         except jwt.ExpiredSignatureError:
@@ -95,6 +240,45 @@ def token_required(f):
     return decorated
 
 
+# SimpleCache.inc is a plain get + set, so threaded workers serialize it here
+_rate_limit_lock = threading.Lock()
+
+
+def _count_request(key, per):
+    """Increment a rate-limit window counter and return the new count"""
+    if isinstance(cache.cache, SimpleCache):
+        with _rate_limit_lock:
+            cache.add(key, 0, timeout=per)
+            return cache.cache.inc(key) or 0
+
+    # Atomic INCR on Redis/Memcached
+    cache.add(key, 0, timeout=per)
+    return cache.cache.inc(key) or 0
+
+
+def rate_limit(limit, per=60):
+    """
+    Allow at most `limit` calls per client IP every `per` seconds
+    (fixed window counted in the cache; with the default per-process
+    SimpleCache each worker counts separately)
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            window = int(time.time() // per)
+            key = f"rate:{f.__name__}:{request.remote_addr}:{window}"
+
+            if _count_request(key, per) > limit:
+                return jsonify({
+                    "status": "error",
+                    "message": "Too many requests. Please slow down."
+                }), 429
+
+            return f(*args, **kwargs)
+        return decorated
+    return decorator
+
+
 def save_file(file, folder, allowed_extensions):
     """Securely save uploaded file with unique name"""
     if not file or not file.filename:
@@ -119,6 +303,17 @@ def save_file(file, folder, allowed_extensions):
 
 
 
+def raiseload_guard():
+    """
+    Query options that make any unplanned lazy load raise, for endpoints
+    whose relationships are all loaded up front. Empty unless the
+    SQLA_RAISELOAD config flag is on (dev/QA), so production is unaffected
+    """
+    if current_app.config.get("SQLA_RAISELOAD", False):
+        return [raiseload("*")]
+    return []
+
+
 def is_ajax_request():
     """Check if request is an AJAX call"""
     return request.headers.get('X-Requested-With') == 'XMLHttpRequest'
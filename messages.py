@@ -20,11 +20,12 @@ import os
 from models import (
     User, Message, Connection, Notification, ThreadMember
 )
-from extensions import db
+from extensions import db, cache
 from routes.student.helpers import (
     token_required, success_response, error_response,
     save_file, ALLOWED_IMAGE_EXT, ALLOWED_DOCUMENT_EXT
 )
+from routes.student.connections import get_pair_connection, invalidate_connection_status
 
 messages_bp = Blueprint("student_messages", __name__)
 
@@ -46,16 +47,10 @@ def can_message(sender_id, receiver_id):
     if sender_id == receiver_id:
         return False
     
-    # Check for accepted connection
-    connection = Connection.query.filter(
-        or_(
-            and_(Connection.requester_id == sender_id, Connection.receiver_id == receiver_id),
-            and_(Connection.requester_id == receiver_id, Connection.receiver_id == sender_id)
-        ),
-        Connection.status == "accepted"
-    ).first()
+    # Check for accepted connection (cached per pair)
+    connection = get_pair_connection(sender_id, receiver_id)
     
-    if connection:
+    if connection and connection["status"] == "accepted":
         return True
     
     return False
@@ -69,12 +64,17 @@ def get_conversation_partner(conversation, current_user_id):
 
 
 def create_conversation_key(user1_id, user2_id):
-    sorted_ids = sorted([user1_id, user2_id])
-    return f"{sorted_ids[0]}-{sorted_ids[1]}"
+    low, high = (user1_id, user2_id) if user1_id < user2_id else (user2_id, user1_id)
+    return f"{low}-{high}"
+
+
+# Typing indicators live in the shared cache so every worker sees them, and
+# expire on their own if the client never sends stop-typing
+TYPING_STATUS_TTL = 10  # seconds
 
 
-# In-memory typing status (can be moved to Redis for production)
-typing_status = {}
+def typing_cache_key(conv_key, user_id):
+    return f"typing:{conv_key}:{user_id}"
 
 
 # ============================================================================
@@ -317,18 +317,6 @@ def send_message(current_user):
         if not receiver:
             return error_response("Receiver not found", 404)
         
-        # Check if blocked
-        block = Connection.query.filter(
-            or_(
-                and_(Connection.requester_id == current_user.id, Connection.receiver_id == receiver_id),
-                and_(Connection.requester_id == receiver_id, Connection.receiver_id == current_user.id)
-            ),
-            Connection.status == "blocked"
-        ).first()
-        
-        if block:
-            return error_response("Cannot message this user", 403)
-        
         # Handle file attachment
         attachment_path = None
         if 'attachment' in request.files:
@@ -595,14 +583,15 @@ def get_unread_count(current_user):
 def set_typing_status(current_user, partner_id):
     """
     Set typing status (user is typing)
-    No timeout - manual control
+    Expires after TYPING_STATUS_TTL seconds unless sent again
     """
     try:
         conv_key = create_conversation_key(current_user.id, partner_id)
-        typing_status[conv_key] = {
-            "user_id": current_user.id,
-            "started_at": datetime.datetime.utcnow().isoformat()
-        }
+        cache.set(
+            typing_cache_key(conv_key, current_user.id),
+            datetime.datetime.utcnow().isoformat(),
+            timeout=TYPING_STATUS_TTL
+        )
         
         return success_response("Typing status set")
         
@@ -619,8 +608,7 @@ def stop_typing_status(current_user, partner_id):
     """
     try:
         conv_key = create_conversation_key(current_user.id, partner_id)
-        if conv_key in typing_status:
-            del typing_status[conv_key]
+        cache.delete(typing_cache_key(conv_key, current_user.id))
         
         return success_response("Typing status cleared")
         
@@ -638,14 +626,14 @@ def check_typing_status(current_user, partner_id):
     """
     try:
         conv_key = create_conversation_key(current_user.id, partner_id)
-        typing_data = typing_status.get(conv_key)
+        started_at = cache.get(typing_cache_key(conv_key, partner_id))
         
-        if typing_data and typing_data["user_id"] == partner_id:
+        if started_at:
             return jsonify({
                 "status": "success",
                 "data": {
                     "is_typing": True,
-                    "started_at": typing_data["started_at"]
+                    "started_at": started_at
                 }
             })
         
@@ -912,16 +900,12 @@ def check_can_message(current_user, user_id):
                 }
             })
         
-        # Check if blocked
-        block = Connection.query.filter(
-            or_(
-                and_(Connection.requester_id == current_user.id, Connection.receiver_id == user_id),
-                and_(Connection.requester_id == user_id, Connection.receiver_id == current_user.id)
-            ),
-            Connection.status == "blocked"
-        ).first()
+        # A pair has at most one connection row - one (cached) lookup
+        # answers blocked / connected / pending
+        connection = get_pair_connection(current_user.id, user_id)
+        status = connection["status"] if connection else None
         
-        if block:
+        if status == "blocked":
             return jsonify({
                 "status": "success",
                 "data": {
@@ -931,7 +915,7 @@ def check_can_message(current_user, user_id):
             })
         
         # Check if connected
-        if can_message(current_user.id, user_id):
+        if status == "accepted":
             return jsonify({
                 "status": "success",
                 "data": {
@@ -941,16 +925,10 @@ def check_can_message(current_user, user_id):
             })
         
         # Not connected - check if pending connection
-        pending = Connection.query.filter(
-            or_(
-                and_(Connection.requester_id == current_user.id, Connection.receiver_id == user_id),
-                and_(Connection.requester_id == user_id, Connection.receiver_id == current_user.id)
-            ),
-            Connection.status == "pending"
-        ).first()
+        pending = status == "pending"
         
         if pending:
-            if pending.requester_id == current_user.id:
+            if connection["requester_id"] == current_user.id:
                 reason = "Connection request pending - waiting for acceptance"
             else:
                 reason = "User sent you a connection request - accept to message"
@@ -1002,6 +980,7 @@ def block_user_messaging(current_user, user_id):
             db.session.add(connection)
         
         db.session.commit()
+        invalidate_connection_status(current_user.id, user_id)
         
         return success_response("User blocked from messaging")
         
@@ -1032,6 +1011,7 @@ def unblock_user_messaging(current_user, user_id):
         # Remove connection entirely
         db.session.delete(connection)
         db.session.commit()
+        invalidate_connection_status(current_user.id, user_id)
         
         return success_response("User unblocked")
         
@@ -5,6 +5,7 @@ Added MutableDict and MutableList for proper JSON field tracking
 
 import datetime
 from flask_login import UserMixin
+from sqlalchemy import case, event, func, inspect, update
 from sqlalchemy.ext.mutable import MutableDict, MutableList
 from extensions import db
 # ============================================================================
@@ -41,6 +42,13 @@ class User(UserMixin, db.Model):
     login_streak = db.Column(db.Integer, default=0)
     total_posts = db.Column(db.Integer, default=0)
     total_helpful = db.Column(db.Integer, default=0)
+
+    # Badge counters - kept in step by the hooks at the end of this module
+    total_solutions = db.Column(db.Integer, default=0)
+    total_connections = db.Column(db.Integer, default=0)
+    total_threads_created = db.Column(db.Integer, default=0)
+    total_large_threads = db.Column(db.Integer, default=0)
+    earned_badge_ids = db.Column(MutableList.as_mutable(db.JSON), default=list)  # Kept by stage_badge_awards
     
     # Profile customization - FIXED: Using MutableList and MutableDict
     # Profile customization - stored as JSON for flexibility
@@ -103,13 +111,18 @@ class User(UserMixin, db.Model):
         return f"<User @{self.username or self.email}>"
 
 
+# Case-insensitive uniqueness - auth lower-cases input, these stop "Foo@x.com"
+# and "foo@x.com" from coexisting via any other write path
+db.Index('ix_users_email_lower', func.lower(User.email), unique=True)
+db.Index('ix_users_username_lower', func.lower(User.username), unique=True)
+
+
 class StudentProfile(db.Model):
     """Extended profile info specific to students"""
     __tablename__ = "student_profiles"
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, unique=True)
-    pin = db.Column(db.String(200), nullable=False)
     username = db.Column(db.String(50), unique=True, nullable=True, index=True)
     
     # Academic info
@@ -121,13 +134,16 @@ class StudentProfile(db.Model):
     date_of_birth = db.Column(db.Date, nullable=True)
     guardian_name = db.Column(db.String(120))
     guardian_contact = db.Column(db.String(50))
-    pin = db.Column(db.String(200))  # Added for compatibility
     username = db.Column(db.String(50))  # Added for compatibility
     
     # Status
     status = db.Column(db.String(50), default="active")
     registered_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
 
+    __table_args__ = (
+        db.Index('ix_student_profiles_dept_user', 'department', 'user_id'),
+    )
+
     def __repr__(self):
         return f"<Student @{self.user.username if self.user else 'Unknown'} - {self.department}>"
 
@@ -136,6 +152,12 @@ class StudentProfile(db.Model):
 # CONTENT MODELS
 # ============================================================================
 
+def posted_day_of_week(context):
+    """Column default: weekday of posted_at (Monday=0, matches calendar.day_name)"""
+    posted_at = context.get_current_parameters().get("posted_at") or datetime.datetime.utcnow()
+    return posted_at.weekday()
+
+
 class Post(db.Model):
     """Main content type - questions, discussions, resources"""
     __tablename__ = "posts"
@@ -160,6 +182,8 @@ class Post(db.Model):
     likes_count = db.Column(db.Integer, default=0)
     dislikes_count = db.Column(db.Integer, default=0)
     views = db.Column(db.Integer, default=0)
+    views_today = db.Column(db.Integer, default=0)  # Resets when views_today_date rolls over
+    views_today_date = db.Column(db.Date)
     comments_count = db.Column(db.Integer, default=0)
     bookmarks = db.Column(db.Integer, default=0)  # Added missing field
     
@@ -176,6 +200,15 @@ class Post(db.Model):
     edited_at = db.Column(db.DateTime)
     solved_at = db.Column(db.DateTime)
     
+    # Denormalized weekday of posted_at - lets analytics group by an int column
+    posted_dow = db.Column(db.SmallInteger, default=posted_day_of_week)
+    
+    __table_args__ = (
+        db.Index('ix_posts_student_dow', 'student_id', 'posted_dow'),
+        db.Index('ix_posts_student_posted', 'student_id', 'posted_at'),
+        db.Index('ix_posts_student_keyset', 'student_id', 'id'),  # Keyset pages for exports
+    )
+    
     # Relationships
     comments = db.relationship("Comment", backref="post", lazy="dynamic", cascade="all, delete-orphan")
     threads = db.relationship("Thread", backref="post", lazy="dynamic", cascade="all, delete-orphan")
@@ -187,6 +220,14 @@ class Post(db.Model):
         return f"<Post {self.id}: {self.title[:30]}>"
 
 
+# Expression index backing "best post" (likes + comments) lookups per author
+db.Index(
+    'ix_posts_student_score',
+    Post.student_id,
+    (Post.likes_count + Post.comments_count).self_group().desc()
+)
+
+
 class Comment(db.Model):
     """Comments on posts - supports nested replies"""
     __tablename__ = "comments"
@@ -195,6 +236,9 @@ class Comment(db.Model):
     post_id = db.Column(db.Integer, db.ForeignKey("posts.id"), nullable=False, index=True)
     student_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
     parent_id = db.Column(db.Integer, db.ForeignKey("comments.id"), nullable=True)
+    
+    # Denormalized from the parent post (post_type can't be edited)
+    post_type = db.Column(db.String(50))
 
     # Content
     text_content = db.Column(db.Text, nullable=False)
@@ -205,13 +249,20 @@ class Comment(db.Model):
     likes_count = db.Column(db.Integer, default=0)
     
     # Status
-    is_solution = db.Column(db.Boolean, default=False)
+    is_solution = db.column_property(
+        db.Column(db.Boolean, default=False), active_history=True
+    )
     is_deleted = db.Column(db.Boolean, default=False)
 
     # Timestamps
     posted_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
     edited_at = db.Column(db.DateTime)
     
+    __table_args__ = (
+        db.Index('ix_comments_student_post', 'student_id', 'post_id'),
+        db.Index('ix_comments_student_posttype', 'student_id', 'post_type'),
+    )
+    
     # Relationships
     replies = db.relationship(
         "Comment",
@@ -247,7 +298,9 @@ class Thread(db.Model):
     tags = db.Column(MutableList.as_mutable(db.JSON), default=list)
     
     # Stats
-    member_count = db.Column(db.Integer, default=1)
+    member_count = db.column_property(
+        db.Column(db.Integer, default=1), active_history=True
+    )
     message_count = db.Column(db.Integer, default=0)
     
     # Timestamps
@@ -339,7 +392,9 @@ class Connection(db.Model):
     requester_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False, index=True)
     receiver_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False, index=True)
     
-    status = db.Column(db.String(20), default="pending", index=True)
+    status = db.column_property(
+        db.Column(db.String(20), default="pending", index=True), active_history=True
+    )
     
     requested_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
     responded_at = db.Column(db.DateTime)
@@ -349,13 +404,31 @@ class Connection(db.Model):
     
     __table_args__ = (
         db.UniqueConstraint('requester_id', 'receiver_id', name='unique_connection'),
-        db.CheckConstraint('requester_id != receiver_id', name='no_self_connection')
+        db.CheckConstraint('requester_id != receiver_id', name='no_self_connection'),
+        db.Index('ix_connections_requester_status', 'requester_id', 'status'),
+        db.Index('ix_connections_receiver_status', 'receiver_id', 'status'),
     )
 
     def __repr__(self):
         return f"<Connection: {self.requester_id} → {self.receiver_id} [{self.status}]>"
 
 
+# One row per user pair in either direction - send_connection_request relies
+# on this to insert requests atomically instead of check-then-insert
+db.Index(
+    'ix_connections_pair',
+    case(
+        (Connection.requester_id < Connection.receiver_id, Connection.requester_id),
+        else_=Connection.receiver_id
+    ).self_group(),
+    case(
+        (Connection.requester_id < Connection.receiver_id, Connection.receiver_id),
+        else_=Connection.requester_id
+    ).self_group(),
+    unique=True
+)
+
+
 class Mention(db.Model):
     """Track @username mentions"""
     __tablename__ = "mentions"
@@ -442,7 +515,10 @@ class PostReaction(db.Model):
     reaction_type = db.Column(db.String(20), nullable=False)
     reacted_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
     
-    __table_args__ = (db.UniqueConstraint('post_id', 'student_id', name='unique_post_reaction'),)
+    __table_args__ = (
+        db.UniqueConstraint('post_id', 'student_id', name='unique_post_reaction'),
+        db.Index('ix_post_reactions_post_type_reacted', 'post_id', 'reaction_type', 'reacted_at'),
+    )
 
     def __repr__(self):
         return f"<Reaction: {self.reaction_type} on Post {self.post_id}>"
@@ -456,6 +532,9 @@ class Bookmark(db.Model):
     post_id = db.Column(db.Integer, db.ForeignKey("posts.id"), nullable=False, index=True)
     student_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False, index=True)
     
+    # Denormalized author of the bookmarked post
+    post_owner_id = db.Column(db.Integer, db.ForeignKey("users.id"), index=True)
+    
     folder = db.Column(db.String(100), default="Saved", index=True)
     notes = db.Column(db.Text)
     
@@ -506,7 +585,10 @@ class UserBadge(db.Model):
     earned_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
     is_featured = db.Column(db.Boolean, default=False)
     
-    __table_args__ = (db.UniqueConstraint('user_id', 'badge_id', name='unique_user_badge'),)
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'badge_id', name='unique_user_badge'),
+        db.Index('ix_user_badges_badge_earned', 'badge_id', 'earned_at'),  # Recent earners
+    )
     
     badge = db.relationship("Badge", backref="user_badges")
 
@@ -530,6 +612,11 @@ class ReputationHistory(db.Model):
     
     reputation_before = db.Column(db.Integer)
     reputation_after = db.Column(db.Integer)
+    
+    __table_args__ = (
+        db.Index('ix_reputation_history_user_created', 'user_id', 'created_at', postgresql_include=['points_change']),
+        db.Index('ix_reputation_history_user_keyset', 'user_id', 'id'),  # Keyset pages for exports
+    )
 
     def __repr__(self):
         return f"<RepHistory: User {self.user_id} {self.points_change:+d} pts for {self.action}>"
@@ -723,6 +810,8 @@ class PostView(db.Model):
     
     __table_args__ = (
         db.UniqueConstraint('post_id', 'viewer_id', 'view_date', name='unique_daily_view'),
+        db.Index('ix_post_views_post_date', 'post_id', 'view_date'),
+        db.Index('ix_post_views_post_viewed', 'post_id', 'viewed_at', postgresql_include=['viewer_id']),
     )
 
     def __repr__(self):
@@ -748,12 +837,73 @@ class UserActivity(db.Model):
     # Total score for the day
     activity_score = db.Column(db.Integer, default=0)
     
-    __table_args__ = (db.UniqueConstraint('user_id', 'activity_date', name='unique_daily_activity'),)
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'activity_date', name='unique_daily_activity'),
+        db.Index('ix_user_activity_user_date', 'user_id', 'activity_date', postgresql_include=['activity_score']),
+    )
 
     def __repr__(self):
         return f"<Activity: User {self.user_id} on {self.activity_date}>"
 
 
+class UserWeeklyStats(db.Model):
+    """Rolling 7-day stats per user, rebuilt nightly for the analytics dashboard"""
+    __tablename__ = "user_weekly_stats"
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False, index=True)
+
+    # First day of the 7-day window the row covers
+    week_start = db.Column(db.Date, nullable=False)
+
+    # Window totals
+    views = db.Column(db.Integer, default=0)
+    helpful = db.Column(db.Integer, default=0)
+    rep_change = db.Column(db.Integer, default=0)
+    activity_score = db.Column(db.Integer, default=0)
+    badges_earned = db.Column(db.Integer, default=0)
+    posts_created = db.Column(db.Integer, default=0)
+    new_connections = db.Column(db.Integer, default=0)
+
+    refreshed_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+
+    __table_args__ = (db.UniqueConstraint('user_id', 'week_start', name='unique_user_week'),)
+
+    def __repr__(self):
+        return f"<WeeklyStats: User {self.user_id} from {self.week_start}>"
+
+
+class DepartmentRank(db.Model):
+    """Reputation rank of approved users within their department, rebuilt on a schedule"""
+    __tablename__ = "department_leaderboard"
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False, unique=True)
+    department = db.Column(db.String(100), nullable=False, index=True)
+
+    # RANK() OVER (PARTITION BY department ORDER BY reputation DESC)
+    rank = db.Column(db.Integer, nullable=False)
+
+    refreshed_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+
+    def __repr__(self):
+        return f"<DepartmentRank: User {self.user_id} #{self.rank} in {self.department}>"
+
+
+class UserInsights(db.Model):
+    """Last generated analytics insights per user, refreshed off the request path"""
+    __tablename__ = "user_insights"
+
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), primary_key=True)
+    payload = db.Column(db.JSON, default=list)
+
+    # NULL once the user's activity makes the payload stale
+    generated_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f"<UserInsights: User {self.user_id} at {self.generated_at}>"
+
+
 class TrendingPost(db.Model):
     """Cached trending posts - recalculated periodically"""
     __tablename__ = "trending_posts"
@@ -824,6 +974,91 @@ class UserWarning(db.Model):
         return f"<Warning: User {self.user_id} - {self.severity} [{self.reason}]>"
 
 
- 
+# ============================================================================
+# DENORMALIZED USER COUNTERS
+# ============================================================================
+
+LARGE_THREAD_MEMBERS = 10  # "large thread" for the thread badges
+
+
+def _value_before_flush(target, attr):
+    """
+    An attribute's value before the pending change (current value if unchanged)
+
+    Tracked columns are declared with active_history=True so the old value
+    is loaded even when the attribute was expired at assignment time
+    """
+    history = inspect(target).attrs[attr].history
+    if history.deleted:
+        return history.deleted[0]
+    if history.added:
+        raise RuntimeError(
+            f"{type(target).__name__}.{attr} changed without its previous value; "
+            "declare the column with active_history=True"
+        )
+    return getattr(target, attr)
+
+
+def track_user_counter(model, column, owners, counts):
+    """
+    Keep User.<column> equal to the number of model rows that count for a user
+
+    owners(row) -> user ids the row belongs to
+    counts(get) -> whether a row counts, reading attributes through get(name)
+
+    Runs as in-flush UPDATEs (col = col + delta) on ORM unit-of-work flushes.
+    Every attribute counts() reads must be declared with active_history=True,
+    otherwise an assignment to an expired attribute loses the old value.
+    Bulk Query.update()/delete() and Core statements bypass it and must not
+    be used on the tracked attributes
+    """
+    counter = getattr(User, column)
+
+    def bump(connection, target, delta):
+        if delta:
+            connection.execute(
+                update(User)
+                .where(User.id.in_(owners(target)))
+                .values({column: func.coalesce(counter, 0) + delta})
+            )
+
+    @event.listens_for(model, "after_insert")
+    def after_insert(mapper, connection, target):
+        bump(connection, target, int(counts(lambda attr: getattr(target, attr))))
+
+    @event.listens_for(model, "after_delete")
+    def after_delete(mapper, connection, target):
+        bump(connection, target, -int(counts(lambda attr: _value_before_flush(target, attr))))
+
+    @event.listens_for(model, "after_update")
+    def after_update(mapper, connection, target):
+        before = counts(lambda attr: _value_before_flush(target, attr))
+        after = counts(lambda attr: getattr(target, attr))
+        bump(connection, target, int(after) - int(before))
+
+
+track_user_counter(
+    Comment, "total_solutions",
+    owners=lambda comment: [comment.student_id],
+    counts=lambda get: bool(get("is_solution"))
+)
+track_user_counter(
+    Connection, "total_connections",
+    owners=lambda connection: [connection.requester_id, connection.receiver_id],
+    counts=lambda get: get("status") == "accepted"
+)
+track_user_counter(
+    Thread, "total_threads_created",
+    owners=lambda thread: [thread.creator_id],
+    counts=lambda get: True
+)
+track_user_counter(
+    Thread, "total_large_threads",
+    owners=lambda thread: [thread.creator_id],
+    counts=lambda get: (get("member_count") or 0) >= LARGE_THREAD_MEMBERS
+)
+
+
+# ============================================================================
 # END OF MODELS
 # ============================================================================
\ No newline at end of file
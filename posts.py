@@ -21,6 +21,7 @@ from routes.student.helpers import (
     token_required, success_response, error_response,
     save_file, ALLOWED_IMAGE_EXT, ALLOWED_DOCUMENT_EXT
 )
+from routes.student.analytics import invalidate_insights, invalidate_user_analytics
 
 posts_bp = Blueprint("student_posts", __name__)
 
@@ -124,34 +125,72 @@ def check_spam(user_id, content_type="post"):
     return False, None
 
 
+# Daily activity counter and score points per activity type
+ACTIVITY_POINTS = {
+    "post": ("posts_created", 5),
+    "comment": ("comments_created", 2),
+}
+
+
 def update_user_activity(user_id, activity_type):
     """
     Update or create daily activity record for user
     Used for activity heatmap and streak tracking
+
+    Runs as a single INSERT ... ON CONFLICT DO UPDATE on the
+    (user_id, activity_date) unique key, so the heatmap reads a
+    pre-aggregated row per day and concurrent writes can't race
     """
+    if activity_type not in ACTIVITY_POINTS:
+        return None
+
+    counter, points = ACTIVITY_POINTS[activity_type]
     today = datetime.date.today()
-    
-    activity = UserActivity.query.filter_by(
-        user_id=user_id,
-        activity_date=today
-    ).first()
-    
-    if not activity:
-        activity = UserActivity(
+
+    dialect = db.session.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        insert = None
+
+    if insert is None:
+        # No native upsert - fall back to read-then-write
+        activity = UserActivity.query.filter_by(
             user_id=user_id,
             activity_date=today
-        )
-        db.session.add(activity)
-    
-    # Increment counters
-    if activity_type == "post":
-        activity.posts_created += 1
-        activity.activity_score += 5
-    elif activity_type == "comment":
-        activity.comments_created += 1
-        activity.activity_score += 2
-    
-    return activity
+        ).first()
+
+        if not activity:
+            activity = UserActivity(
+                user_id=user_id,
+                activity_date=today,
+                posts_created=0,
+                comments_created=0,
+                activity_score=0
+            )
+            db.session.add(activity)
+
+        setattr(activity, counter, getattr(activity, counter) + 1)
+        activity.activity_score += points
+        return activity
+
+    table = UserActivity.__table__
+    stmt = insert(table).values(
+        user_id=user_id,
+        activity_date=today,
+        activity_score=points,
+        **{counter: 1}
+    ).on_conflict_do_update(
+        index_elements=[table.c.user_id, table.c.activity_date],
+        set_={
+            counter: table.c[counter] + 1,
+            "activity_score": table.c.activity_score + points
+        }
+    )
+    db.session.execute(stmt)
+    return None
 
 
 # ============================================================================
@@ -287,6 +326,7 @@ def create_post(current_user):
         update_user_activity(current_user.id, "post")
         
         db.session.commit()
+        invalidate_user_analytics(current_user.id)
         
         return success_response(
             "Post created successfully!",
@@ -346,6 +386,13 @@ def get_post(current_user, post_id):
             )
             db.session.add(view)
             post.views += 1
+            
+            # Denormalized daily counter (read by the trending insight)
+            if post.views_today_date == today:
+                post.views_today += 1
+            else:
+                post.views_today = 1
+                post.views_today_date = today
             db.session.commit()
         
         # Get author info
@@ -525,6 +572,7 @@ def edit_post(current_user, post_id):
         if changes:
             post.edited_at = datetime.datetime.utcnow()
             db.session.commit()
+            invalidate_insights(current_user.id)
             
             return success_response(
                 "Post updated successfully",
@@ -814,6 +862,7 @@ def bookmark_post(current_user, post_id):
         bookmark = Bookmark(
             post_id=post_id,
             student_id=current_user.id,
+            post_owner_id=post.student_id,
             folder=folder,
             notes=notes if notes else None
         )
@@ -1038,9 +1087,9 @@ def unmark_solved(current_user, post_id):
         post.solved_at = None
         
         # Unmark solution comment
-        Comment.query.filter_by(post_id=post_id, is_solution=True).update(
-            {"is_solution": False}
-        )
+        # Per row (not a bulk update) so the commenter's solution counter follows
+        for comment in Comment.query.filter_by(post_id=post_id, is_solution=True):
+            comment.is_solution = False
         
         db.session.commit()
         
@@ -1194,6 +1243,7 @@ def add_comment(current_user, post_id):
             post_id=post_id,
             student_id=current_user.id,
             parent_id=parent_id,
+            post_type=post.post_type,
             text_content=text_content
         )
         
@@ -1241,6 +1291,7 @@ def add_comment(current_user, post_id):
         update_user_activity(current_user.id, "comment")
         
         db.session.commit()
+        invalidate_user_analytics(current_user.id)
         
         return success_response(
             "Comment added",
@@ -20,7 +20,7 @@ Reputation Levels:
 """
 
 from flask import Blueprint, request, jsonify, current_app
-from sqlalchemy import func, desc, and_, or_
+from sqlalchemy import func, desc, and_, or_, case
 import datetime
 
 from models import (
@@ -459,18 +459,20 @@ def get_department_leaderboard(current_user, department):
         your_rank = None
         current_profile = StudentProfile.query.filter_by(user_id=current_user.id).first()
         
+        # Department size and users ranked above you in one scan
+        dept_stats = db.session.query(
+            func.count(User.id).label('total'),
+            func.sum(case((User.reputation > current_user.reputation, 1), else_=0)).label('above')
+        ).join(StudentProfile).filter(
+            StudentProfile.department == department,
+            User.status == "approved"
+        ).one()
+        
         if current_profile and current_profile.department == department:
-            your_rank = db.session.query(func.count(User.id)).join(StudentProfile).filter(
-                StudentProfile.department == department,
-                User.reputation > current_user.reputation,
-                User.status == "approved"
-            ).scalar() + 1
+            your_rank = (dept_stats.above or 0) + 1
         
         # Total users in department
-        total_dept_users = db.session.query(func.count(User.id)).join(StudentProfile).filter(
-            StudentProfile.department == department,
-            User.status == "approved"
-        ).scalar()
+        total_dept_users = dept_stats.total
         
         return jsonify({
             "status": "success",
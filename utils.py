@@ -1,25 +1,32 @@
-import jwt
-import datetime
+import hashlib
 from flask import current_app
+from itsdangerous import URLSafeTimedSerializer, SignatureExpired, BadSignature
 import requests
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 # ===============================
 # 1️⃣ Generate Verification Token
 # ===============================
-def generate_verification_token(email):
-    """Generate JWT token that expires in 1 hour for email verification."""
+VERIFICATION_TOKEN_MAX_AGE = 60 * 60  # 1 hour
+
+
+def _verification_serializer():
+    """Timestamped, BLAKE2s-HMAC-signed serializer for email verification links."""
+    return URLSafeTimedSerializer(
+        current_app.config["SECRET_KEY"],
+        salt="email-verification",
+        signer_kwargs={"digest_method": hashlib.blake2s}
+    )
+
+
+def generate_verification_token(user_id):
+    """Generate a signed token for the user id that expires in 1 hour."""
     try:
-        payload = {
-            "email": email,
-            "exp": datetime.datetime.utcnow() + datetime.timedelta(hours=1),
-            "iat": datetime.datetime.utcnow()
-        }
-        token = jwt.encode(payload, current_app.config["SECRET_KEY"], algorithm="HS256")
-        return token
+        return _verification_serializer().dumps(user_id)
     except Exception as e:
         current_app.logger.error(f"Token generation failed: {e}")
         return None
@@ -29,13 +36,13 @@ def generate_verification_token(email):
 # 2️⃣ Verify Token
 # ===============================
 def verify_token(token):
+    """Return the user id from a verification token, or None if expired/invalid."""
     try:
-        payload = jwt.decode(token, current_app.config["SECRET_KEY"], algorithms=["HS256"])
-        return payload.get("email")
-    except jwt.ExpiredSignatureError:
+        return _verification_serializer().loads(token, max_age=VERIFICATION_TOKEN_MAX_AGE)
+    except SignatureExpired:
         current_app.logger.warning("Verification token expired.")
         return None
-    except jwt.InvalidTokenError:
+    except BadSignature:
         current_app.logger.warning("Invalid verification token.")
         return None
     except Exception as e:
@@ -98,4 +105,17 @@ def send_verification_email(to_email, verification_url, retries=3, delay=2):
                 print(f"⏳ Retrying in {delay} seconds...")
                 time.sleep(delay)
             else:
-                print("⚠️ All retry attempts failed. Email not sent.")            
\ No newline at end of file
+                print("⚠️ All retry attempts failed. Email not sent.")            
+
+
+# ===============================
+# 3️⃣ Send Email Off the Request Path
+# ===============================
+# SMTP (with retries) can take seconds; a few background workers keep it
+# out of the registration response time
+_email_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="email")
+
+
+def send_verification_email_async(to_email, verification_url):
+    """Queue send_verification_email on a background thread and return immediately."""
+    return _email_executor.submit(send_verification_email, to_email, verification_url)